@@ -0,0 +1,106 @@
+# backend/admission.py
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed; reason is "queue_full" or "deadline".
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Bounded admission in front of expensive work.
+
+    At most max_concurrent callers run at once. Up to max_queue more wait,
+    first come first served. A caller that would exceed the queue is
+    rejected straight away ("queue_full"). A caller that waited longer than
+    queue_deadline seconds is rejected ("deadline") rather than doing work
+    its client has likely given up on. max_concurrent=0 admits everyone.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_deadline=1.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_deadline = queue_deadline
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "queue_full": 0, "deadline": 0, "wait_seconds": 0.0}
+
+    @property
+    def enabled(self):
+        return self.max_concurrent > 0
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def acquire(self):
+        """
+        Take a slot, waiting if needed. Returns the seconds spent waiting.
+        """
+        with self._lock:
+            if not self._waiters and self.active < self.max_concurrent:
+                self.active += 1
+                self.stats["admitted"] += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self.stats["queue_full"] += 1
+                raise AdmissionRejected("queue_full")
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        start = time.monotonic()
+        waiter.event.wait(self.queue_deadline)
+        waited = time.monotonic() - start
+        with self._lock:
+            self.stats["wait_seconds"] += waited
+            # A slot may have been handed over just as the wait timed out
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self.stats["deadline"] += 1
+                raise AdmissionRejected("deadline")
+            self.stats["admitted"] += 1
+        return waited
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the slot straight to the oldest waiter
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self.active -= 1
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold a slot for the duration of the block; yields the wait in seconds.
+        Raises AdmissionRejected when the request is shed.
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+        waited = self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
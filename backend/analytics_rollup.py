@@ -0,0 +1,130 @@
+# backend/analytics_rollup.py
+
+import os
+import threading
+
+
+def hour_bucket(created_at):
+    return created_at.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+class RollupCounters:
+    """
+    Per-hour chat counters kept in memory and flushed to the database.
+
+    record() adds one turn to its (hour, intent, sentiment bucket) counter:
+    a dict update under a lock, nothing else on the request path. A
+    background thread hands the accumulated counters to write_rollups(rows)
+    every flush_interval seconds; rows are {"hour", "intent", "sentiment",
+    "turns", "sentiment_sum"} deltas that write_rollups adds onto what is
+    stored, so any number of workers can flush into the same tables. If a
+    write fails the deltas are merged back and retried on the next flush.
+
+    The flusher starts on first use in each process, so counters created
+    before a fork work in every worker. close() flushes what is left.
+    """
+
+    def __init__(self, write_rollups, flush_interval=10.0):
+        self.write_rollups = write_rollups
+        self.flush_interval = flush_interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.stats = {"recorded": 0, "flushes": 0, "rows_written": 0, "failed": 0}
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._thread is None or self._pid != os.getpid():
+                # Counts inherited across a fork were the parent's to flush
+                if self._pid is not None and self._pid != os.getpid():
+                    self._counts = {}
+                    self._lock = threading.Lock()
+                self._pid = os.getpid()
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, name="analytics-rollup", daemon=True)
+                self._thread.start()
+
+    def record(self, created_at, intent, sentiment_bucket, sentiment=None):
+        self._ensure_started()
+        key = (hour_bucket(created_at), intent, sentiment_bucket)
+        with self._lock:
+            counter = self._counts.get(key)
+            if counter is None:
+                counter = self._counts[key] = [0, 0.0]
+            counter[0] += 1
+            counter[1] += sentiment or 0.0
+            self.stats["recorded"] += 1
+
+    @property
+    def pending(self):
+        return len(self._counts)
+
+    def _merge_back(self, counts):
+        with self._lock:
+            for key, (turns, sentiment_sum) in counts.items():
+                counter = self._counts.setdefault(key, [0, 0.0])
+                counter[0] += turns
+                counter[1] += sentiment_sum
+
+    def flush(self):
+        """
+        Write the counters accumulated since the last flush.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        rows = [{"hour": hour, "intent": intent, "sentiment": bucket, "turns": turns, "sentiment_sum": sentiment_sum}
+                for (hour, intent, bucket), (turns, sentiment_sum) in counts.items()]
+        try:
+            self.write_rollups(rows)
+        except Exception:
+            self._merge_back(counts)
+            self.stats["failed"] += 1
+            return
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+
+def rollup_rows(rows, granularity):
+    """
+    Fold rollup rows (period, intent, sentiment bucket, turns, sentiment_sum)
+    into one entry per (period, intent) with the turns per sentiment bucket,
+    the share of scored turns that were negative and the mean sentiment.
+    """
+    entries = {}
+    for period, intent, bucket, turns, sentiment_sum in rows:
+        entry = entries.get((period, intent))
+        if entry is None:
+            entry = entries[(period, intent)] = {
+                granularity: period, "intent": intent, "turns": 0,
+                "positive": 0, "neutral": 0, "negative": 0, "unscored": 0, "_sentiment_sum": 0.0,
+            }
+        entry["turns"] += turns
+        entry[bucket] = entry.get(bucket, 0) + turns
+        entry["_sentiment_sum"] += sentiment_sum or 0.0
+    results = []
+    for entry in entries.values():
+        scored = entry["turns"] - entry["unscored"]
+        sentiment_sum = entry.pop("_sentiment_sum")
+        entry["negative_share"] = round(entry["negative"] / scored, 4) if scored else None
+        entry["mean_sentiment"] = round(sentiment_sum / scored, 4) if scored else None
+        results.append(entry)
+    return results
@@ -0,0 +1,39 @@
+# backend/analyzed_message.py
+
+from nlu_cache import normalize_message
+
+
+class AnalyzedMessage:
+    """
+    One chat message prepared once and shared by every NLU stage.
+
+    text   - whitespace-normalized message (what VADER and spaCy read)
+    lower  - lowercased text (what the keyword matchers read)
+    keyword_hits - keywords found by the intent matcher, filled on first use
+    knowledge - the KnowledgeSnapshot the message is analyzed with, pinned on first use
+    doc    - the spaCy Doc for text, filled on first use
+
+    The lazy fields are each written by a single stage, so the object can be
+    handed to stages running concurrently.
+    """
+
+    __slots__ = ("text", "lower", "keyword_hits", "knowledge", "doc")
+
+    def __init__(self, user_message):
+        self.text = normalize_message(user_message)
+        self.lower = self.text.lower()
+        self.keyword_hits = None
+        self.knowledge = None
+        self.doc = None
+
+    def __repr__(self):
+        return f"AnalyzedMessage({self.text!r})"
+
+
+def as_analyzed(user_message):
+    """
+    Accept either a raw message or an AnalyzedMessage.
+    """
+    if isinstance(user_message, AnalyzedMessage):
+        return user_message
+    return AnalyzedMessage(user_message)
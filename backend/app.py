@@ -1,16 +1,68 @@
+import atexit
+import csv
 import os
+import sys
 import re
-from datetime import timedelta
-from flask import Flask, request, jsonify, session
+import secrets
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from warmup import Warmup, WARMUP_MODES
+import click
+from flask import Flask, request, jsonify, session, g, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from werkzeug.security import generate_password_hash, check_password_hash
-from nlu_utils import extract_intent, extract_entities, analyze_sentiment, get_follow_up_question
+from sqlalchemy import and_, case, event, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from nlu_utils import (analyze_message, analyze_crisis, get_follow_up_question, analyze_batch, knowledge,
+                       warmup_phases)
+from analyzed_message import AnalyzedMessage
+from conversation_store import create_conversation_store
+from conversation_state import ConversationContext
+from password_hasher import PasswordHasher, HasherBusy
+from response_table import ResponseTable
+from nlu_worker import NLUWorkerUnavailable
+from admission import AdmissionController, AdmissionRejected
+from history_writer import WriteBehindQueue, HistoryBackpressure
+from history_export import EXPORT_FORMATS, InvalidCursor, decode_cursor, format_pages, gzip_chunks
+from user_import import IMPORT_FORMATS, detect_format, read_users, import_users
+from analytics_rollup import RollupCounters, hour_bucket, rollup_rows
+from metrics import (registry, STAGE_SECONDS, REQUEST_SECONDS, CHAT_RESPONSES, ADMISSION_WAIT_SECONDS,
+                     sentiment_bucket)
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-CORS(app, supports_credentials=True)
+
+# Startup phases, timed from the first import; /ready reports them
+warmup = Warmup()
+
+def load_secret_key():
+    """
+    Use CALMORA_SECRET_KEY if set; otherwise share one key, generated on first
+    start, between all workers through the instance folder.
+    """
+    if os.environ.get("CALMORA_SECRET_KEY"):
+        return os.environ["CALMORA_SECRET_KEY"]
+    os.makedirs(app.instance_path, exist_ok=True)
+    key_path = os.path.join(app.instance_path, "secret_key")
+    # Write the key to a private temp file and link it into place, so the
+    # key file only ever appears complete; if another worker won the race,
+    # use its key.
+    fd, tmp_path = tempfile.mkstemp(dir=app.instance_path, prefix=".secret_key-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, key_path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp_path)
+    with open(key_path) as f:
+        return f.read().strip()
+
+app.secret_key = load_secret_key()
+CORS(app, supports_credentials=True, expose_headers=["X-Calmora-NLU-Tier", "X-Calmora-Knowledge-Version"])
 
 # Set the session lifetime to 3 hours (adjust as needed)
 app.permanent_session_lifetime = timedelta(hours=3)
@@ -18,6 +70,71 @@ app.permanent_session_lifetime = timedelta(hours=3)
 # Configure the SQLite database
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///users.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+# Server-side conversation history; the session cookie only carries its id.
+# CALMORA_CONVERSATION_STORE is "memory" (per process) or "sqlite" (shared by workers).
+app.config["CONVERSATION_STORE"] = os.environ.get("CALMORA_CONVERSATION_STORE", "memory")
+app.config["CONVERSATION_DB"] = os.environ.get(
+    "CALMORA_CONVERSATION_DB", os.path.join(app.instance_path, "conversations.db"))
+app.config["CONVERSATION_MAX_ENTRIES"] = int(os.environ.get("CALMORA_CONVERSATION_MAX_ENTRIES", 6))
+app.config["CONVERSATION_MAX_USERS"] = int(os.environ.get("CALMORA_CONVERSATION_MAX_USERS", 10000))
+# Conversations idle for longer than this are pruned from the sqlite store;
+# defaults to the session lifetime, after which they can't be resumed anyway
+app.config["CONVERSATION_MAX_AGE"] = float(os.environ.get(
+    "CALMORA_CONVERSATION_MAX_AGE", app.permanent_session_lifetime.total_seconds()))
+
+# Conversation context: how fast past intents fade, how much the newest turn
+# moves the sentiment average, and how strong a past intent must still be to
+# answer a vague ("general") message
+app.config["CONTEXT_DECAY"] = float(os.environ.get("CALMORA_CONTEXT_DECAY", 0.6))
+app.config["CONTEXT_SENTIMENT_ALPHA"] = float(os.environ.get("CALMORA_CONTEXT_SENTIMENT_ALPHA", 0.6))
+app.config["CONTEXT_MIN_SCORE"] = float(os.environ.get("CALMORA_CONTEXT_MIN_SCORE", 0.5))
+
+# Password hashing runs in its own small process pool; past the cap, logins get a 503
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("CALMORA_PASSWORD_HASH_METHOD") or None
+app.config["PASSWORD_POOL_SIZE"] = int(os.environ.get("CALMORA_PASSWORD_POOL_SIZE", 2))
+app.config["PASSWORD_MAX_PENDING"] = int(os.environ.get("CALMORA_PASSWORD_MAX_PENDING", 16))
+
+# Admission control in front of the /chat NLU work: concurrent analyses, how
+# many may queue behind them, and how long one may wait before it is shed.
+# CALMORA_CHAT_MAX_CONCURRENT=0 turns it off. Crisis messages are never shed.
+app.config["CHAT_MAX_CONCURRENT"] = int(os.environ.get("CALMORA_CHAT_MAX_CONCURRENT", 8))
+app.config["CHAT_MAX_QUEUE"] = int(os.environ.get("CALMORA_CHAT_MAX_QUEUE", 32))
+app.config["CHAT_QUEUE_DEADLINE_MS"] = float(os.environ.get("CALMORA_CHAT_QUEUE_DEADLINE_MS", 1000))
+
+# Serve pre-gzipped chat responses to clients that accept gzip
+app.config["GZIP_RESPONSES"] = os.environ.get("CALMORA_GZIP_RESPONSES", "0") == "1"
+
+# Durable chat history in users.db, written behind the request in batches.
+# CALMORA_CHAT_HISTORY=0 turns it off.
+app.config["CHAT_HISTORY"] = os.environ.get("CALMORA_CHAT_HISTORY", "1") != "0"
+app.config["HISTORY_BATCH_SIZE"] = int(os.environ.get("CALMORA_HISTORY_BATCH_SIZE", 100))
+app.config["HISTORY_FLUSH_MS"] = float(os.environ.get("CALMORA_HISTORY_FLUSH_MS", 500))
+app.config["HISTORY_MAX_QUEUE"] = int(os.environ.get("CALMORA_HISTORY_MAX_QUEUE", 10000))
+
+# Hourly intent x sentiment counters kept in memory by /chat and added onto
+# the rollup table every CALMORA_ANALYTICS_FLUSH_SECONDS. CALMORA_ANALYTICS=0 turns it off.
+app.config["ANALYTICS"] = os.environ.get("CALMORA_ANALYTICS", "1") != "0"
+app.config["ANALYTICS_FLUSH_SECONDS"] = float(os.environ.get("CALMORA_ANALYTICS_FLUSH_SECONDS", 10))
+# /analytics covers every user's conversations, so only these accounts
+# (comma-separated emails, e.g. the clinical leads) may read it
+app.config["ANALYTICS_VIEWERS"] = frozenset(
+    email.strip().lower() for email in os.environ.get("CALMORA_ANALYTICS_VIEWERS", "").split(",") if email.strip())
+
+# Rows fetched per keyset page when streaming /history/export
+app.config["EXPORT_PAGE_SIZE"] = int(os.environ.get("CALMORA_EXPORT_PAGE_SIZE", 500))
+
+# How the rest of startup runs once the app is imported: "background" (the
+# server binds at once and /ready turns 200 when models are warm), "blocking"
+# (everything is warmed before the server binds) or "off" (only the database
+# tables are created; models load on first use)
+app.config["WARMUP"] = os.environ.get("CALMORA_WARMUP", "background")
+if app.config["WARMUP"] not in WARMUP_MODES:
+    raise ValueError(f"Unknown warm-up mode {app.config['WARMUP']!r}, expected one of {WARMUP_MODES}")
+
+# Limits for /chat/batch
+app.config["CHAT_BATCH_MAX_MESSAGES"] = int(os.environ.get("CALMORA_CHAT_BATCH_MAX_MESSAGES", 256))
+app.config["NLP_BATCH_SIZE"] = int(os.environ.get("CALMORA_NLP_BATCH_SIZE", 64))
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
@@ -28,643 +145,305 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
 
+# One row per chat session (the conversation id kept in the session cookie)
+class Conversation(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+
+# One row per chat turn: what the user said, how it was analyzed and which
+# response was sent. Recent history per user is read through (user_id, created_at).
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.String(32), db.ForeignKey("conversation.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    intent = db.Column(db.String(40), nullable=False)
+    sentiment = db.Column(db.Float)
+    response_id = db.Column(db.String(64), nullable=False)
+
+    __table_args__ = (db.Index("ix_message_user_created", "user_id", "created_at"),)
+
+# Chat turns per hour, intent and sentiment bucket, maintained incrementally
+# by /chat and read by /analytics. The primary key leads with the hour, so a
+# time range is one index range scan.
+class IntentRollup(db.Model):
+    hour = db.Column(db.DateTime, primary_key=True)
+    intent = db.Column(db.String(40), primary_key=True)
+    sentiment = db.Column(db.String(16), primary_key=True)
+    turns = db.Column(db.Integer, nullable=False)
+    sentiment_sum = db.Column(db.Float, nullable=False)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the history writer; NORMAL sync is
+    # durable across application crashes and only fsyncs at checkpoints
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 with app.app_context():
-    db.create_all()
-
-# Comprehensive response templates for mental health issues
-RESPONSES = {
-    "loneliness": {
-        "positive": (
-            "🌱 I notice you're experiencing some loneliness but maintaining a positive outlook, which is a strength. "
-            "Consider building on this by:\n\n"
-            "1️⃣ Scheduling regular virtual or in-person meetups with friends\n"
-            "2️⃣ Joining community groups aligned with your interests\n"
-            "3️⃣ Volunteering for causes you care about\n\n"
-            "✨ These activities can deepen your sense of connection. Remember that quality relationships often develop gradually. "
-            "💡 If loneliness persists, consulting with a therapist like Dr. Sarah Chen, who specializes in interpersonal connections, could provide personalized strategies."
-        ),
-        "neutral": (
-            "🧩 Feeling lonely is a common human experience. To address this, you might:\n\n"
-            "1️⃣ Reach out to one person you trust each day\n"
-            "2️⃣ Join a class or group that meets regularly\n"
-            "3️⃣ Practice self-compassion when feelings of loneliness arise\n\n"
-            "⏳ Building meaningful connections takes time, so be patient with yourself. "
-            "📱 Applications like Meetup or community center bulletin boards can help you find groups with shared interests. "
-            "🔍 If loneliness continues to affect your daily life, consider speaking with a counselor like Dr. James Wilson, who specializes in social connection."
-        ),
-        "negative": (
-            "💙 I'm truly sorry you're experiencing such profound loneliness. This feeling can be overwhelming and painful. "
-            "When loneliness feels this intense, immediate steps might include:\n\n"
-            "1️⃣ Calling a supportive friend or family member\n"
-            "2️⃣ Contacting a crisis helpline like the Crisis Text Line (text HOME to 741741)\n"
-            "3️⃣ Scheduling an appointment with a mental health professional\n\n"
-            "🌟 Please know that deep loneliness can be addressed with proper support. "
-            "👩‍⚕️ Dr. Lisa Rodriguez specializes in isolation and loneliness issues and offers both in-person and telehealth appointments. "
-            "🔆 Remember that reaching out for help is a sign of strength, not weakness."
-        )
-    },
-    "depression": {
-        "positive": (
-            "🌻 I appreciate your openness about your feelings while maintaining some positive perspective. "
-            "For managing mild depressive symptoms, consider:\n\n"
-            "1️⃣ Maintaining a regular sleep schedule\n"
-            "2️⃣ Engaging in 30 minutes of physical activity daily\n"
-            "3️⃣ Practicing mindfulness meditation using apps like Headspace or Calm\n\n"
-            "📊 Tracking your mood with an app like MoodKit can help identify patterns. "
-            "👨‍⚕️ If you notice your symptoms changing, Dr. Michael Thompson specializes in mood disorders and can provide professional guidance."
-        ),
-        "neutral": (
-            "🌧️ Depression can make everyday tasks feel much harder. Some evidence-based approaches include:\n\n"
-            "1️⃣ Setting small, achievable daily goals\n"
-            "2️⃣ Establishing a routine with regular meals and sleep times\n"
-            "3️⃣ Limiting alcohol and caffeine consumption\n"
-            "4️⃣ Connecting with at least one supportive person regularly\n\n"
-            "📝 Remember that depression is a medical condition, not a personal failing. "
-            "👩‍⚕️ Consider reaching out to Dr. Rebecca Lee, who uses cognitive behavioral therapy techniques for depression management. "
-            "🤝 Organizations like the Depression and Bipolar Support Alliance also offer peer support groups that many find helpful."
-        ),
-        "negative": (
-            "💜 I'm truly sorry you're experiencing such intense depressive symptoms. When depression feels this severe, please prioritize your safety. "
-            "If you're having thoughts of harming yourself, please contact the National Suicide Prevention Lifeline at 988 immediately.\n\n"
-            "For immediate relief:\n"
-            "1️⃣ Reach out to someone you trust\n"
-            "2️⃣ Focus on getting through just the next hour rather than the whole day\n"
-            "3️⃣ Remove any potentially harmful items from your environment\n\n"
-            "👨‍⚕️ Dr. David Kim specializes in treatment-resistant depression and offers urgent appointments. "
-            "✨ Remember that severe depression is highly treatable with proper support, and many people recover completely."
-        )
-    },
-    "anxiety": {
-        "positive": (
-            "🌈 I notice you're managing anxiety while maintaining perspective, which is impressive. "
-            "To build on your coping skills:\n\n"
-            "1️⃣ Practice progressive muscle relaxation daily\n"
-            "2️⃣ Use the 5-4-3-2-1 grounding technique when anxiety spikes (identify 5 things you can see, 4 things you can touch, etc.)\n"
-            "3️⃣ Consider keeping an anxiety journal to track triggers and successful coping strategies\n\n"
-            "🤖 Apps like Woebot can provide in-the-moment cognitive behavioral therapy techniques. "
-            "👩‍⚕️ Dr. Jennifer Patel specializes in anxiety management and can help refine your approach if needed."
-        ),
-        "neutral": (
-            "🧠 Anxiety can be uncomfortable but is manageable with proper techniques. You might try:\n\n"
-            "1️⃣ Practicing box breathing (inhale for 4 counts, hold for 4, exhale for 4, hold for 4)\n"
-            "2️⃣ Challenging anxious thoughts by asking 'What's the evidence for and against this worry?'\n"
-            "3️⃣ Gradually exposing yourself to situations that cause mild anxiety while using relaxation techniques\n\n"
-            "🚶‍♀️ Physical exercise is also proven to reduce anxiety symptoms. "
-            "👨‍⚕️ Dr. Thomas Chen specializes in anxiety disorders and can provide personalized treatment options, including both therapy and medication if appropriate."
-        ),
-        "negative": (
-            "💙 I'm so sorry you're experiencing such intense anxiety. When anxiety feels overwhelming:\n\n"
-            "1️⃣ Focus first on slow, deep breathing - inhale for 4 counts, hold for 1, exhale for 6\n"
-            "2️⃣ Identify and name what you're feeling as specifically as possible\n"
-            "3️⃣ Move your body gently – even just walking around the room can help reduce the physical symptoms\n\n"
-            "⚡ If you're experiencing panic attacks, remember they always pass and aren't physically dangerous. "
-            "👩‍⚕️ Dr. Maria Sanchez specializes in severe anxiety and panic disorders and offers same-week appointments. "
-            "✨ Please consider reaching out, as severe anxiety responds very well to proper treatment."
-        )
-    },
-    "stress": {
-        "positive": (
-            "🌱 It sounds like you're handling stress relatively well while recognizing its impacts. "
-            "To enhance your stress management:\n\n"
-            "1️⃣ Schedule regular 'worry time' – 15 minutes daily to address concerns, then set them aside\n"
-            "2️⃣ Practice time-blocking your schedule to prevent multitasking\n"
-            "3️⃣ Identify energy-draining activities and delegate when possible\n\n"
-            "⏱️ The Pomodoro technique (25 minutes of focused work followed by a 5-minute break) can also help manage workload stress. "
-            "👨‍⚕️ Dr. Robert Johnson specializes in stress management and work-life balance if you'd like professional guidance."
-        ),
-        "neutral": (
-            "⚖️ Stress is our body's response to demands, and finding balance is key. Consider:\n\n"
-            "1️⃣ Creating clear boundaries between work and personal time\n"
-            "2️⃣ Practicing brief mindfulness exercises during transitions between activities\n"
-            "3️⃣ Identifying your stress warning signs (headaches, irritability, etc.) to catch stress early\n"
-            "4️⃣ Ensuring you get 7-9 hours of sleep\n\n"
-            "🧘‍♀️ Activities like yoga, tai chi, or leisurely walking combine physical movement with mindfulness for effective stress reduction. "
-            "👩‍⚕️ Dr. Alicia Wong specializes in stress-related conditions and can help develop a personalized stress management plan."
-        ),
-        "negative": (
-            "💜 I'm truly sorry you're under such extreme stress. When stress feels overwhelming:\n\n"
-            "1️⃣ Focus first on basic self-care – proper meals, hydration, and rest\n"
-            "2️⃣ Temporarily reduce commitments where possible\n"
-            "3️⃣ Break large problems into smaller, manageable tasks\n"
-            "4️⃣ Reach out to your support network for specific help\n\n"
-            "⚠️ Chronic severe stress can impact your physical health, so please prioritize addressing it. "
-            "👨‍⚕️ Dr. William Park specializes in chronic stress and burnout recovery and offers both immediate coping strategies and longer-term resilience building. "
-            "💼 Many employers also offer Employee Assistance Programs providing free confidential counseling."
-        )
-    },
-    "ptsd": {
-        "positive": (
-            "🌟 I appreciate your resilience in dealing with trauma. For continued healing:\n\n"
-            "1️⃣ Maintain your established safety practices\n"
-            "2️⃣ Continue engaging with supportive communities\n"
-            "3️⃣ Practice sensory grounding techniques when memories arise\n\n"
-            "📱 The PTSD Coach app offers evidence-based tools for managing symptoms. "
-            "👩‍⚕️ Dr. Sophia Martinez specializes in trauma-informed care and can provide trauma-specific therapies like EMDR or CPT if helpful."
-        ),
-        "neutral": (
-            "🧠 Trauma responses are normal reactions to abnormal situations. Some helpful approaches include:\n\n"
-            "1️⃣ Establishing predictable routines to create a sense of safety\n"
-            "2️⃣ Learning to recognize triggers and developing a safety plan for each\n"
-            "3️⃣ Practicing dual awareness when flashbacks occur (acknowledging the memory while staying grounded in the present)\n"
-            "4️⃣ Connecting with others who understand trauma responses\n\n"
-            "👨‍⚕️ Dr. Nathan Williams specializes in trauma recovery and offers evidence-based treatments like Prolonged Exposure therapy and EMDR."
-        ),
-        "negative": (
-            "💙 I'm deeply sorry you're experiencing such difficult trauma symptoms. When trauma responses feel overwhelming:\n\n"
-            "1️⃣ Focus first on your immediate safety\n"
-            "2️⃣ Use the 5-4-3-2-1 grounding technique to reconnect with the present moment\n"
-            "3️⃣ Wrap yourself in a blanket or hold a cold object to anchor yourself physically\n"
-            "4️⃣ Remind yourself that you've survived the trauma and are now safe\n\n"
-            "🔍 The National Center for PTSD offers crisis resources at www.ptsd.va.gov. "
-            "👩‍⚕️ Dr. Elena Rodriguez specializes in complex trauma and offers trauma-sensitive approaches to healing. PTSD is treatable, and recovery is possible."
-        )
-    },
-    "grief": {
-        "positive": (
-            "🕊️ I can see you're finding ways to cope with your loss while honoring your grief. "
-            "As you continue healing:\n\n"
-            "1️⃣ Allow yourself to celebrate good moments without guilt\n"
-            "2️⃣ Create meaningful rituals to honor your loved one\n"
-            "3️⃣ Consider joining a grief support group to connect with others who understand\n\n"
-            "🌊 Remember that grief often comes in waves rather than linear stages. "
-            "👨‍⚕️ Dr. Samuel Johnson specializes in grief counseling and can help navigate the complex emotions that may arise."
-        ),
-        "neutral": (
-            "🍂 Grief is a natural response to loss, and everyone experiences it differently. "
-            "Some approaches that might help:\n\n"
-            "1️⃣ Express your feelings through journaling, art, or conversation\n"
-            "2️⃣ Be patient with yourself on difficult days\n"
-            "3️⃣ Maintain basic self-care routines\n"
-            "4️⃣ Accept that grief may resurface around anniversaries or holidays\n\n"
-            "📚 The book 'It's OK That You're Not OK' by Megan Devine offers compassionate guidance. "
-            "👩‍⚕️ Dr. Sarah Williams specializes in grief counseling and can provide professional support if needed."
-        ),
-        "negative": (
-            "💜 I'm truly sorry for your profound loss and the pain you're experiencing. "
-            "When grief feels unbearable:\n\n"
-            "1️⃣ Focus on just getting through this moment rather than thinking too far ahead\n"
-            "2️⃣ Reach out to someone who will simply listen without trying to fix your feelings\n"
-            "3️⃣ Give yourself permission to grieve in whatever way feels natural\n"
-            "4️⃣ Consider contacting a grief counselor or hospice grief support services\n\n"
-            "👩‍⚕️ Dr. Jessica Chen specializes in complicated grief and provides compassionate support. "
-            "🤝 The organization GriefShare also offers local support groups where many find comfort in shared experiences."
-        )
-    },
-    "addiction": {
-        "positive": (
-            "🌱 I appreciate your awareness and positive steps toward addressing addiction concerns. "
-            "To continue your progress:\n\n"
-            "1️⃣ Identify and strengthen your specific reasons for change\n"
-            "2️⃣ Build a broader support network, including both professional help and peer support\n"
-            "3️⃣ Develop additional healthy coping strategies for triggers\n\n"
-            "🧠 The SMART Recovery program offers science-based tools for addiction recovery. "
-            "👨‍⚕️ Dr. Marcus Lee specializes in addiction medicine and can provide medical support if needed."
-        ),
-        "neutral": (
-            "⚖️ Addressing addiction requires both compassion and practical strategies. "
-            "Some helpful approaches include:\n\n"
-            "1️⃣ Honestly assessing how substance use is affecting different areas of your life\n"
-            "2️⃣ Identifying specific triggers and creating a plan for each\n"
-            "3️⃣ Exploring both professional treatment options and peer support groups\n"
-            "4️⃣ Practicing stress management techniques like meditation or exercise\n\n"
-            "📞 The Substance Abuse and Mental Health Services Administration (SAMHSA) offers a 24/7 helpline at 1-800-662-HELP. "
-            "👩‍⚕️ Dr. Rachel Foster specializes in addiction treatment and can help determine the best approach for your situation."
-        ),
-        "negative": (
-            "💙 I'm truly sorry you're struggling with addiction. When substance use feels overwhelming:\n\n"
-            "1️⃣ Remember that addiction is a medical condition, not a moral failing\n"
-            "2️⃣ Consider reaching out to SAMHSA's National Helpline at 1-800-662-HELP for immediate support\n"
-            "3️⃣ If you're experiencing withdrawal symptoms, seek medical attention as some withdrawals can be dangerous\n"
-            "4️⃣ Know that recovery is possible even after multiple attempts\n\n"
-            "👨‍⚕️ Dr. Michael Chen specializes in addiction medicine and offers both medication-assisted treatment and therapy options. "
-            "💰 Many treatment centers also offer financial assistance or sliding scale fees."
-        )
-    },
-    "relationship": {
-        "positive": (
-            "💫 I notice you're taking a thoughtful approach to your relationship situation. "
-            "To continue building healthy connections:\n\n"
-            "1️⃣ Practice assertive communication using 'I' statements\n"
-            "2️⃣ Establish clear boundaries that honor both your needs and others'\n"
-            "3️⃣ Schedule regular check-ins with your partner to discuss concerns before they escalate\n\n"
-            "📚 The book 'The Seven Principles for Making Marriage Work' by John Gottman offers evidence-based relationship strategies. "
-            "👩‍⚕️ Dr. Lisa Patel specializes in couples counseling and can provide additional tools if needed."
-        ),
-        "neutral": (
-            "🔄 Relationships naturally go through challenges and transitions. Some helpful approaches include:\n\n"
-            "1️⃣ Identifying specific relationship patterns rather than focusing only on individual incidents\n"
-            "2️⃣ Practicing active listening without planning your response\n"
-            "3️⃣ Taking short breaks when discussions become heated\n"
-            "4️⃣ Finding activities that bring you together in positive ways\n\n"
-            "🌐 The Gottman Institute website offers free relationship resources. "
-            "👨‍⚕️ Dr. James Anderson specializes in relationship counseling and can help navigate complex relationship dynamics."
-        ),
-        "negative": (
-            "💜 I'm truly sorry you're experiencing such difficult relationship challenges. When relationship distress feels overwhelming:\n\n"
-            "1️⃣ Prioritize your physical and emotional safety above all else\n"
-            "2️⃣ Establish clear boundaries about acceptable behavior\n"
-            "3️⃣ Consider whether temporary distance might help provide clarity\n"
-            "4️⃣ Seek support from trusted friends or family\n\n"
-            "⚠️ If there's any physical or emotional abuse, the National Domestic Violence Hotline is available 24/7 at 1-800-799-7233. "
-            "👩‍⚕️ Dr. Emily Washington specializes in relationship crisis intervention and can provide immediate strategies as well as longer-term support."
-        )
-    },
-    "breakup": {
-        "positive": (
-            "🌱 I can see you're processing your breakup with some perspective, which shows emotional strength. "
-            "To continue healing:\n\n"
-            "1️⃣ Acknowledge your progress while allowing yourself to experience difficult emotions when they arise\n"
-            "2️⃣ Rediscover activities and interests that may have been set aside during the relationship\n"
-            "3️⃣ Consider what you've learned about yourself and your needs for future relationships\n\n"
-            "👨‍⚕️ Dr. Thomas Rivera specializes in life transitions and can help navigate this new chapter."
-        ),
-        "neutral": (
-            "🧩 Breakups can be deeply challenging even when they're for the best. Some helpful approaches include:\n\n"
-            "1️⃣ Giving yourself permission to grieve the relationship while creating a new routine\n"
-            "2️⃣ Setting boundaries around contact with your ex-partner that protect your emotional wellbeing\n"
-            "3️⃣ Leaning on your support network without feeling you must always appear 'over it'\n"
-            "4️⃣ Being patient with the healing process\n\n"
-            "📚 The book 'Rebuilding When Your Relationship Ends' by Bruce Fisher offers a structured approach to healing. "
-            "👩‍⚕️ Dr. Olivia Martinez specializes in breakup recovery and can provide professional guidance if needed."
-        ),
-        "negative": (
-            "💙 I'm truly sorry you're experiencing such profound pain after your breakup. "
-            "When the hurt feels overwhelming:\n\n"
-            "1️⃣ Focus on basic self-care like eating regularly and getting rest\n"
-            "2️⃣ Consider temporarily limiting social media to avoid additional triggers\n"
-            "3️⃣ Allow yourself to fully express your emotions in private or with trusted supporters\n"
-            "4️⃣ Remember that intense emotional pain does eventually subside with time and proper support\n\n"
-            "👨‍⚕️ Dr. Daniel Kim specializes in breakup trauma and offers both immediate coping strategies and longer-term healing techniques. "
-            "🤝 Many people find that joining a support group helps them feel less alone during this difficult time."
-        )
-    },
-    "insomnia": {
-        "positive": (
-            "✨ I appreciate your proactive approach to addressing your sleep concerns. "
-            "To further improve your sleep quality:\n\n"
-            "1️⃣ Maintain your consistent sleep schedule even on weekends\n"
-            "2️⃣ Create a 30-minute wind-down routine before bed without screens\n"
-            "3️⃣ Consider sleep restriction therapy, which temporarily reduces time in bed to build stronger sleep drive\n\n"
-            "📱 The CBT-i Coach app offers evidence-based sleep improvement techniques. "
-            "👩‍⚕️ Dr. Angela Wei specializes in sleep medicine and can provide additional personalized strategies."
-        ),
-        "neutral": (
-            "🌙 Sleep difficulties can significantly impact daily functioning. Some evidence-based approaches include:\n\n"
-            "1️⃣ Establishing a consistent sleep schedule seven days a week\n"
-            "2️⃣ Creating a bedroom environment that's cool, dark, and quiet\n"
-            "3️⃣ Avoiding caffeine after noon and alcohol within 3 hours of bedtime\n"
-            "4️⃣ Getting out of bed if you're unable to fall asleep within 20 minutes\n\n"
-            "🧠 Cognitive Behavioral Therapy for Insomnia (CBT-I) is considered the first-line treatment for chronic insomnia. "
-            "👨‍⚕️ Dr. Robert Johnson specializes in sleep disorders and can provide comprehensive assessment and treatment."
-        ),
-        "negative": (
-            "💜 I'm truly sorry you're struggling with such severe sleep issues. Ongoing insomnia can be extremely distressing. "
-            "For immediate relief:\n\n"
-            "1️⃣ Focus on rest rather than sleep – lying quietly with eyes closed still provides some rejuvenation\n"
-            "2️⃣ Avoid checking the time during the night, which increases anxiety\n"
-            "3️⃣ Practice gentle relaxation techniques like progressive muscle relaxation\n"
-            "4️⃣ Consider speaking with a healthcare provider about short-term medication options while developing long-term sleep skills\n\n"
-            "👩‍⚕️ Dr. Michelle Park specializes in complex sleep disorders and can help determine if underlying issues like sleep apnea might be contributing to your insomnia."
-        )
-    },
-    "eating_disorder": {
-        "positive": (
-            "🌱 I appreciate your awareness and efforts regarding your eating patterns. "
-            "To support continued healing:\n\n"
-            "1️⃣ Work with a registered dietitian who specializes in eating disorders to develop a flexible, nourishing meal plan\n"
-            "2️⃣ Practice identifying emotions that trigger eating disorder thoughts\n"
-            "3️⃣ Continue building a support network that understands eating disorder recovery\n\n"
-            "🔄 Recovery is rarely linear, so self-compassion during setbacks is essential. "
-            "👩‍⚕️ Dr. Sarah Miller specializes in eating disorder treatment and can provide comprehensive care."
-        ),
-        "neutral": (
-            "⚖️ Concerns about eating patterns deserve compassionate attention. Some helpful approaches include:\n\n"
-            "1️⃣ Seeking assessment from healthcare providers with eating disorder expertise\n"
-            "2️⃣ Working toward regular, adequate nutrition with professional guidance\n"
-            "3️⃣ Identifying underlying emotions or beliefs that may be fueling disordered eating\n"
-            "4️⃣ Connecting with others in recovery through organizations like the National Eating Disorders Association\n\n"
-            "✨ Recovery is absolutely possible with proper support. "
-            "👩‍⚕️ Dr. Jessica Chen specializes in eating disorder treatment and offers evidence-based approaches like Enhanced Cognitive Behavioral Therapy."
-        ),
-        "negative": (
-            "💙 I'm deeply concerned about your struggles with eating and want you to know that help is available. "
-            "When eating disorder symptoms are severe:\n\n"
-            "1️⃣ Please consider contacting the National Eating Disorders Association Helpline at 1-800-931-2237 for immediate support\n"
-            "2️⃣ Speak with a healthcare provider as soon as possible, as eating disorders can cause serious medical complications\n"
-            "3️⃣ Remember that struggling with an eating disorder isn't a choice or moral failing – these are complex conditions requiring professional treatment\n\n"
-            "👨‍⚕️ Dr. David Kim specializes in eating disorder recovery and offers urgent assessments. "
-            "🌟 Many people fully recover from eating disorders with comprehensive treatment."
-        )
-    },
-    "self_harm": {
-        "positive": (
-            "🌱 I appreciate your openness about these difficult thoughts. Building on your existing coping strategies, consider:\n\n"
-            "1️⃣ Creating a detailed safety plan with specific actions for different distress levels\n"
-            "2️⃣ Expanding your emotional vocabulary to better identify and express feelings\n"
-            "3️⃣ Working with a therapist on addressing underlying needs and emotions\n\n"
-            "📱 The SafeSpot app offers privacy-protected tracking of urges and healthy coping alternatives. "
-            "👩‍⚕️ Dr. Rebecca Martinez specializes in self-harm recovery and can provide evidence-based approaches like Dialectical Behavior Therapy."
-        ),
-        "neutral": (
-            "🧠 Self-harm thoughts deserve compassionate attention and care. Some helpful approaches include:\n\n"
-            "1️⃣ Creating distance between urges and actions using strategies like 'urge surfing'\n"
-            "2️⃣ Developing a toolkit of alternative coping strategies for different emotions (ice cubes for anger, soft blankets for sadness, etc.)\n"
-            "3️⃣ Practicing mindfulness to increase awareness of emotional triggers\n"
-            "4️⃣ Building a support network of people you can reach out to when urges arise\n\n"
-            "👨‍⚕️ Dr. Michael Wei specializes in self-harm treatment and offers evidence-based approaches like Emotion Regulation Therapy."
-        ),
-        "negative": (
-            "💜 I'm deeply concerned about your self-harm thoughts and want to ensure your safety. "
-            "For immediate support:\n\n"
-            "1️⃣ Please contact the Crisis Text Line by texting HOME to 741741 or call the National Suicide Prevention Lifeline at 988\n"
-            "2️⃣ Remove access to items that could be used for self-harm if possible\n"
-            "3️⃣ Use strong sensory experiences like holding ice cubes or snapping a rubber band as temporary alternatives\n"
-            "4️⃣ Reach out to a trusted person who can stay with you until the intense urges pass\n\n"
-            "👩‍⚕️ Dr. Samantha Park specializes in crisis intervention and can provide immediate and ongoing support. "
-            "✨ Many people who have struggled with self-harm develop effective coping skills with proper support."
-        )
-    },
-    "suicide": {
-        "default": (
-            "❗ I'm deeply concerned about you right now. If you're having thoughts of suicide, please know that immediate help is available. "
-            "Please contact the National Suicide Prevention Lifeline at 988 (call or text) or chat at 988lifeline.org.\n\n"
-            "These trained counselors are available 24/7 to provide support during this difficult time. "
-            "If you're in immediate danger, please call 911 or go to your nearest emergency room.\n\n"
-            "💙 Your life matters, and there are dedicated professionals who can help you through this crisis. "
-            "Many people who have experienced suicidal thoughts have found relief and gone on to live fulfilling lives with proper support.\n\n"
-            "👨‍⚕️ Dr. James Wilson specializes in suicide prevention and crisis management."
-        )
-    },
-    "substance_abuse": {
-        "positive": (
-            "🌱 I appreciate your awareness about substance use concerns. "
-            "To continue making positive changes:\n\n"
-            "1️⃣ Track specific situations, emotions, and thoughts that precede substance use\n"
-            "2️⃣ Expand your toolkit of alternative coping strategies for each trigger\n"
-            "3️⃣ Consider both professional support and peer recovery communities\n\n"
-            "🧠 The SMART Recovery program offers science-based tools for managing addictive behaviors. "
-            "👨‍⚕️ Dr. Thomas Chen specializes in substance use treatment and can discuss various approaches, including medication options if appropriate."
-        ),
-        "neutral": (
-            "⚖️ Concerns about substance use deserve thoughtful attention. Some helpful approaches include:\n\n"
-            "1️⃣ Honestly assessing how substance use affects your relationships, work, health, and goals\n"
-            "2️⃣ Speaking with a healthcare provider about safe options if physical dependence is a concern\n"
-            "3️⃣ Exploring both professional treatment and peer support groups like SMART Recovery or 12-step programs\n"
-            "4️⃣ Developing healthy coping skills for stress and difficult emotions\n\n"
-            "📞 The Substance Abuse and Mental Health Services Administration (SAMHSA) offers a 24/7 helpline at 1-800-662-HELP. "
-            "👩‍⚕️ Dr. Maria Rodriguez specializes in addiction medicine and can help determine the best approach for your situation."
-        ),
-        "negative": (
-            "💙 I'm concerned about your struggles with substances and want you to know that help is available. "
-            "For immediate support:\n\n"
-            "1️⃣ Please consider contacting SAMHSA's National Helpline at 1-800-662-HELP, which provides free, confidential, 24/7 information and referrals\n"
-            "2️⃣ If you're experiencing withdrawal symptoms, seek medical attention as some withdrawals can be dangerous\n"
-            "3️⃣ Know that addiction is a medical condition, not a moral failing, and effective treatments are available\n\n"
-            "👨‍⚕️ Dr. Robert Park specializes in addiction medicine and offers compassionate care, including medication-assisted treatment when appropriate. "
-            "✨ Many people achieve long-term recovery with proper support."
-        )
-    },
-    "bipolar": {
-    "positive": (
-        "🌈 I appreciate your awareness about bipolar symptoms. "
-        "To maintain stability:\n\n"
-        "1️⃣ Continue tracking mood patterns daily, which helps identify early warning signs of episodes\n"
-        "2️⃣ Maintain extremely regular sleep patterns, as sleep disruption can trigger episodes\n"
-        "3️⃣ Work with your provider on a specific plan for what to do if you notice warning signs of mania or depression\n\n"
-        "📱 The app eMoods can help track mood, sleep, medication, and other factors. "
-        "👩‍⚕️ Dr. Elizabeth Chen specializes in bipolar disorder management and can provide comprehensive care."
-    ),
-    "neutral": (
-        "⚖️ Bipolar disorder is a manageable condition with proper treatment. Some helpful approaches include:\n\n"
-        "1️⃣ Working with a psychiatrist experienced in bipolar disorder, as medication is usually an essential component of treatment\n"
-        "2️⃣ Establishing very regular routines for sleep, meals, and exercise\n"
-        "3️⃣ Learning to identify your unique early warning signs of mood episodes\n"
-        "4️⃣ Building a support network that understands bipolar disorder\n\n"
-        "🤝 The Depression and Bipolar Support Alliance offers peer support groups that many find helpful. "
-        "👨‍⚕️ Dr. Michael Thompson specializes in bipolar disorder treatment and offers evidence-based approaches."
-    ),
-    "negative": (
-        "💙 I'm concerned about your bipolar symptoms and want you to know that effective help is available. "
-        "For immediate support:\n\n"
-        "1️⃣ If you're experiencing thoughts of harming yourself, please contact the National Suicide Prevention Lifeline at 988\n"
-        "2️⃣ Contact your healthcare provider or go to the emergency room if you're experiencing severe symptoms, as rapid treatment can prevent full episodes\n"
-        "3️⃣ Know that medication adjustment may be needed, and this is a normal part of bipolar management\n\n"
-        "👩‍⚕️ Dr. Sarah Williams specializes in bipolar disorder treatment and offers urgent appointments for symptom management. "
-        "✨ With proper treatment, many people with bipolar disorder lead stable, fulfilling lives."
-    )
-    },
-    "schizophrenia": {
-    "positive": (
-        "🌟 I appreciate your insight into your experiences. "
-        "To support your continued wellness:\n\n"
-        "1️⃣ Continue working closely with your treatment team\n"
-        "2️⃣ Consider using technology like medication reminder apps to support treatment adherence\n"
-        "3️⃣ Participate in cognitive enhancement programs like Cognitive Remediation Therapy, which can improve cognition and daily functioning\n\n"
-        "🗣️ The LEAP (Listen-Empathize-Agree-Partner) approach can help family members provide effective support. "
-        "👨‍⚕️ Dr. James Chen specializes in schizophrenia spectrum disorders and offers evidence-based treatment approaches."
-    ),
-    "neutral": (
-        "⚖️ Schizophrenia is a complex but treatable condition. Some helpful approaches include:\n\n"
-        "1️⃣ Working with a psychiatrist experienced in psychotic disorders, as medication is a crucial component of treatment\n"
-        "2️⃣ Developing a clear plan for what to do if symptoms increase\n"
-        "3️⃣ Establishing regular routines for sleep, meals, and activities\n"
-        "4️⃣ Connecting with others through organizations like Schizophrenia and Related Disorders Alliance of America\n\n"
-        "🧠 Cognitive Behavioral Therapy for psychosis (CBTp) can help manage persistent symptoms. "
-        "👩‍⚕️ Dr. Rebecca Park specializes in schizophrenia treatment and offers comprehensive care."
-    ),
-    "negative": (
-        "💙 I'm concerned about your experiences and want you to know that effective help is available. "
-        "For immediate support:\n\n"
-        "1️⃣ Please consider contacting the SAMHSA Helpline at 1-800-662-HELP for treatment referrals\n"
-        "2️⃣ If you're experiencing a crisis, the Crisis Text Line (text HOME to 741741) can provide immediate support\n"
-        "3️⃣ Know that with proper treatment, symptoms can significantly improve and many people with schizophrenia lead fulfilling lives\n\n"
-        "🏥 Early Psychosis Intervention Centers offer specialized treatment for early psychosis. "
-        "👨‍⚕️ Dr. Michael Lee specializes in schizophrenia spectrum disorders and provides evidence-based, compassionate care."
-    )
-},
-"ocd": {
-    "positive": (
-        "🌱 I appreciate your awareness about OCD symptoms. "
-        "To build on your progress:\n\n"
-        "1️⃣ Continue practicing Exposure and Response Prevention exercises, gradually increasing difficulty\n"
-        "2️⃣ Apply mindfulness techniques specifically for OCD (like accepting intrusive thoughts without engaging with them)\n"
-        "3️⃣ Work with a therapist to identify and challenge OCD-related beliefs\n\n"
-        "📚 The book 'Freedom from OCD' by Jonathan Grayson offers self-directed ERP exercises. "
-        "👩‍⚕️ Dr. Sarah Thompson specializes in OCD treatment and can provide specialized care."
-    ),
-    "neutral": (
-        "⚖️ OCD is a challenging but treatable condition. Some helpful approaches include:\n\n"
-        "1️⃣ Learning about Exposure and Response Prevention (ERP) therapy, the gold standard treatment for OCD\n"
-        "2️⃣ Working with a therapist trained specifically in OCD treatment\n"
-        "3️⃣ Understanding that seeking certainty fuels OCD cycles\n"
-        "4️⃣ Joining an OCD support group to connect with others who understand\n\n"
-        "🔍 The International OCD Foundation offers resources and provider listings at iocdf.org. "
-        "👨‍⚕️ Dr. David Wilson specializes in OCD treatment and offers evidence-based approaches."
-    ),
-    "negative": (
-        "💙 I'm truly sorry you're struggling with such difficult OCD symptoms. "
-        "For immediate support:\n\n"
-        "1️⃣ Try the 'STOPP' technique when intrusive thoughts arise (Stop, Take a breath, Observe the thought without judgment, Pull back for perspective, Practice what works)\n"
-        "2️⃣ Contact the International OCD Foundation's resource helpline at 617-973-5801\n"
-        "3️⃣ Remember that even severe OCD can significantly improve with proper treatment\n\n"
-        "👩‍⚕️ Dr. Jessica Chen specializes in severe OCD and offers intensive treatment programs when weekly therapy isn't sufficient. "
-        "✨ Many people who have struggled with debilitating OCD have achieved substantial relief with effective treatment."
-    )
-},
-"general": {
-    "positive": (
-        "🌈 I appreciate your thoughtful reflection on your mental health. "
-        "To continue supporting your wellbeing:\n\n"
-        "1️⃣ Consider maintaining a wellness journal to track activities, relationships, and practices that positively impact your mental health\n"
-        "2️⃣ Explore mindfulness practices that resonate with you, such as meditation, mindful walking, or breathwork\n"
-        "3️⃣ Schedule regular check-ins with yourself to assess how you're feeling and what adjustments might help\n\n"
-        "📚 The book 'The Upward Spiral' by Alex Korb explains the neuroscience behind many effective mental health practices. "
-        "👩‍⚕️ Dr. Jennifer Williams specializes in preventative mental healthcare and can provide additional strategies if needed."
-    ),
-    "neutral": (
-        "⚖️ Taking care of your mental health is as important as physical health. Some helpful general approaches include:\n\n"
-        "1️⃣ Establishing consistent routines for sleep, meals, and activity\n"
-        "2️⃣ Practicing stress management techniques like deep breathing or progressive muscle relaxation\n"
-        "3️⃣ Spending time in nature, which research shows improves mood\n"
-        "4️⃣ Nurturing social connections, even brief ones\n\n"
-        "🌐 The website mentalhealth.gov offers reliable information on various mental health topics. "
-        "👨‍⚕️ Dr. Robert Chen provides general mental health care and can help determine if specific concerns need specialized attention."
-    ),
-    "negative": (
-        "💙 I'm sorry you're going through such a difficult time. "
-        "When overall mental health feels poor:\n\n"
-        "1️⃣ Focus first on basics like sleep, nutrition, and some form of movement, however gentle\n"
-        "2️⃣ Reach out to one supportive person rather than isolating yourself\n"
-        "3️⃣ Consider contacting a mental health professional, as proper assessment can guide effective treatment\n"
-        "4️⃣ Remember that mental health can improve with proper support and treatment\n\n"
-        "📞 The SAMHSA National Helpline at 1-800-662-HELP can provide treatment referrals. "
-        "👩‍⚕️ Dr. Sarah Thompson offers comprehensive mental health assessments and can help determine the best approach for your specific situation."
-    )
-},
-"burnout": {
-    "positive": (
-        "🌱 I notice you're recognizing the signs of burnout while maintaining some perspective, which is valuable. "
-        "To address burnout effectively:\n\n"
-        "1️⃣ Identify specific energy drains in your work or life and develop boundaries around them\n"
-        "2️⃣ Schedule regular periods of complete disconnection from work and responsibilities\n"
-        "3️⃣ Reconnect with activities that bring you a sense of meaning and accomplishment\n\n"
-        "📚 The book 'Burnout: The Secret to Unlocking the Stress Cycle' by Emily and Amelia Nagoski offers science-based recovery strategies. "
-        "👩‍⚕️ Dr. Michelle Garcia specializes in burnout recovery and professional sustainability."
-    ),
-    "neutral": (
-        "⚖️ Burnout develops gradually and requires intentional recovery. Some helpful approaches include:\n\n"
-        "1️⃣ Assessing which aspects of your situation contribute most to burnout (workload, control, reward, community, fairness, or values)\n"
-        "2️⃣ Creating clear boundaries between work and rest time\n"
-        "3️⃣ Practicing saying 'no' to additional responsibilities when possible\n"
-        "4️⃣ Reconnecting with the purpose or meaning behind your work or responsibilities\n\n"
-        "⏱️ Short daily restorative practices often help more than occasional longer breaks. "
-        "👨‍⚕️ Dr. James Wilson specializes in burnout recovery and can provide personalized strategies."
-    ),
-    "negative": (
-        "💙 I'm truly sorry you're experiencing such severe burnout. When burnout reaches this level:\n\n"
-        "1️⃣ Consider whether a temporary step back from some responsibilities is possible\n"
-        "2️⃣ Focus on physical restoration through sleep, nutrition, and gentle movement\n"
-        "3️⃣ Seek support from a healthcare provider, as burnout can impact physical health and sometimes resembles depression\n"
-        "4️⃣ Remember that recovery from even severe burnout is possible with proper support and changes\n\n"
-        "👩‍⚕️ Dr. Elizabeth Park specializes in severe burnout recovery and can help create a sustainable path forward. "
-        "✨ Many people recover from burnout and develop more sustainable ways of working and living."
-    )
-},
-"panic": {
-    "positive": (
-        "🌈 I appreciate your awareness of panic experiences. "
-        "To further manage panic symptoms:\n\n"
-        "1️⃣ Practice the 'Five Senses Exercise' during early warning signs (identify five things you can see, four you can touch, three you can hear, two you can smell, one you can taste)\n"
-        "2️⃣ Learn diaphragmatic breathing through resources like the Breathe2Relax app\n"
-        "3️⃣ Gradually expose yourself to feared sensations in safe settings (like mild exercise to experience increased heart rate without danger)\n\n"
-        "👩‍⚕️ Dr. Rachel Foster specializes in panic disorder treatment and can refine your management techniques."
-    ),
-    "neutral": (
-        "⚖️ Panic attacks are frightening but not physically dangerous. Some helpful approaches include:\n\n"
-        "1️⃣ Practicing slow breathing (four counts in, hold for one, six counts out) daily so it's easier to use during panic\n"
-        "2️⃣ Challenging catastrophic thoughts with reality-based alternatives\n"
-        "3️⃣ Learning about the body's fight-or-flight response to understand physical symptoms\n"
-        "4️⃣ Gradually facing feared situations with support\n\n"
-        "🧠 Cognitive Behavioral Therapy is highly effective for panic disorder. "
-        "👨‍⚕️ Dr. Thomas Lee specializes in anxiety disorders and can provide evidence-based treatment."
-    ),
-    "negative": (
-        "💙 I'm truly sorry you're experiencing such terrifying panic symptoms. "
-        "During a panic attack:\n\n"
-        "1️⃣ Focus on fully exhaling - lengthening your exhale helps activate your parasympathetic nervous system\n"
-        "2️⃣ Remind yourself that panic always passes and the sensations cannot harm you\n"
-        "3️⃣ Ground yourself by placing your feet firmly on the floor and noticing the sensation\n"
-        "4️⃣ If possible, continue normal activities during the attack rather than fleeing the situation\n\n"
-        "👩‍⚕️ Dr. Sarah Williams specializes in panic disorder and can provide both immediate management techniques and effective long-term treatment. "
-        "✨ Panic disorder responds very well to proper treatment, and complete recovery is possible."
+    event.listen(db.engine, "connect", set_sqlite_pragmas)
+
+def init_database():
+    with app.app_context():
+        db.create_all()
+
+def write_history(turns):
+    """
+    Write a batch of chat turns in one transaction, creating their
+    conversations on first sight.
+    """
+    conversations_seen = {}
+    for turn in turns:
+        conversations_seen.setdefault(turn["conversation_id"], {
+            "id": turn["conversation_id"], "user_id": turn["user_id"], "started_at": turn["created_at"]})
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(sqlite_insert(Conversation).on_conflict_do_nothing(), list(conversations_seen.values()))
+        conn.execute(Message.__table__.insert(), turns)
+
+history_writer = WriteBehindQueue(
+    write_history,
+    batch_size=app.config["HISTORY_BATCH_SIZE"],
+    flush_interval=app.config["HISTORY_FLUSH_MS"] / 1000,
+    max_queue=app.config["HISTORY_MAX_QUEUE"],
+)
+# Final flush of buffered turns when the process exits; forked workers exit
+# through os._exit, which skips atexit, and call shutdown_worker() instead
+atexit.register(history_writer.close)
+
+def write_rollups(rows):
+    """
+    Add a batch of rollup deltas onto the stored counters in one transaction.
+    """
+    table = IntentRollup.__table__
+    upsert = sqlite_insert(table)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["hour", "intent", "sentiment"],
+        set_={"turns": table.c.turns + upsert.excluded.turns,
+              "sentiment_sum": table.c.sentiment_sum + upsert.excluded.sentiment_sum},
     )
-    },
-    "trauma": {
-    "positive": (
-        "🌱 I appreciate your resilience in addressing trauma. "
-        "To support your continued healing:\n\n"
-        "1️⃣ Continue practicing grounding techniques when trauma memories arise\n"
-        "2️⃣ Consider trauma-specific therapies like EMDR (Eye Movement Desensitization and Reprocessing) or CPT (Cognitive Processing Therapy)\n"
-        "3️⃣ Build a 'trauma-informed' support network of people who understand trauma responses\n\n"
-        "📚 The book 'The Body Keeps the Score' by Bessel van der Kolk explains trauma's impacts and evidence-based treatments. "
-        "👩‍⚕️ Dr. Maria Rodriguez specializes in trauma recovery and offers various trauma-specific therapies."
-    ),
-    "neutral": (
-        "⚖️ Trauma responses are normal reactions to abnormal events. Some helpful approaches include:\n\n"
-        "1️⃣ Learning about how trauma affects the body and brain, which can make responses more understandable\n"
-        "2️⃣ Practicing grounding techniques like the 5-4-3-2-1 exercise when triggered\n"
-        "3️⃣ Building safety and stability in daily life before processing trauma memories\n"
-        "4️⃣ Considering trauma-specific therapies when ready\n\n"
-        "🌐 The National Center for PTSD offers educational resources at www.ptsd.va.gov. "
-        "👨‍⚕️ Dr. William Lee specializes in trauma treatment and can provide trauma-informed care."
-    ),
-    "negative": (
-        "💙 I'm deeply sorry for the trauma you've experienced and the pain you're feeling now. "
-        "When trauma symptoms feel overwhelming:\n\n"
-        "1️⃣ Focus first on establishing physical and emotional safety\n"
-        "2️⃣ Use strong sensory experiences (like holding ice, smelling essential oils, or listening to music) to ground yourself in the present\n"
-        "3️⃣ Remind yourself that you survived the traumatic event(s) and are now in a different time and place\n"
-        "4️⃣ Consider reaching out to a trauma-informed therapist\n\n"
-        "👩‍⚕️ Dr. Jessica Park specializes in complex trauma and offers trauma-sensitive approaches to healing. "
-        "✨ Recovery from trauma is possible, and many people find their symptoms significantly improve with proper support."
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(upsert, rows)
+
+rollups = RollupCounters(write_rollups, flush_interval=app.config["ANALYTICS_FLUSH_SECONDS"])
+atexit.register(rollups.close)
+
+password_hasher = PasswordHasher(
+    method=app.config["PASSWORD_HASH_METHOD"],
+    pool_size=app.config["PASSWORD_POOL_SIZE"],
+    max_pending=app.config["PASSWORD_MAX_PENDING"],
+)
+
+conversations = create_conversation_store(
+    app.config["CONVERSATION_STORE"],
+    path=app.config["CONVERSATION_DB"],
+    max_entries=app.config["CONVERSATION_MAX_ENTRIES"],
+    max_conversations=app.config["CONVERSATION_MAX_USERS"],
+    max_age=app.config["CONVERSATION_MAX_AGE"],
+)
+
+chat_admission = AdmissionController(
+    max_concurrent=app.config["CHAT_MAX_CONCURRENT"],
+    max_queue=app.config["CHAT_MAX_QUEUE"],
+    queue_deadline=app.config["CHAT_QUEUE_DEADLINE_MS"] / 1000,
+)
+
+conversation_context = ConversationContext(
+    decay=app.config["CONTEXT_DECAY"],
+    sentiment_alpha=app.config["CONTEXT_SENTIMENT_ALPHA"],
+    min_score=app.config["CONTEXT_MIN_SCORE"],
+)
+
+# Every (intent, sentiment bucket) answer with its JSON body encoded once per
+# knowledge snapshot. responses.json holds the templates and the intents whose
+# answer depends on the sentiment bucket; any other intent outside them falls
+# back to "general", and suicide always gets its default.
+def compile_responses(data):
+    return ResponseTable(
+        data["responses"],
+        data["sentiment_intents"],
+        encode=lambda message: app.json.response({"message": message}).get_data(),
+        follow_up=get_follow_up_question,
+        gzip_bodies=app.config["GZIP_RESPONSES"],
     )
-    }
-}
 
-def select_response(intent, sentiment, user_message):
+knowledge.add_section("responses", "responses.json", compile_responses)
+
+def select_response(intent, sentiment, user_message, state=None):
     """
     Select an appropriate response based on intent and sentiment analysis.
+    With a ConversationState, the turn is folded into it first (updating it in
+    place) and the response follows the conversation's context.
     """
-    if intent in RESPONSES:
-        # Special case for suicide intent - always return the default response
-        if intent == "suicide":
-            return RESPONSES[intent]["default"]
-        
-        # For other intents with sentiment-based responses
-        if intent in ["loneliness", "depression", "anxiety", "stress", "ptsd", "grief", 
-                      "addiction", "relationship", "breakup", "insomnia", "eating_disorder", 
-                      "self_harm", "substance_abuse", "bipolar", "schizophrenia", "ocd", 
-                      "general", "burnout", "panic", "trauma"]:
-            if sentiment >= 0.3:
-                return RESPONSES[intent]["positive"]
-            elif sentiment <= -0.3:
-                return RESPONSES[intent]["negative"]
-            else:
-                return RESPONSES[intent]["neutral"]
-    
-    # If intent not found or doesn't match any specific condition, return general response
-    if sentiment >= 0.3:
-        return RESPONSES["general"]["positive"]
-    elif sentiment <= -0.3:
-        return RESPONSES["general"]["negative"]
+    if state is not None:
+        intent, sentiment = conversation_context.observe(state, intent, sentiment)
+    return knowledge.current["responses"].text(intent, sentiment if sentiment is not None else 0.0)
+
+def accepts_gzip():
+    """
+    Whether Accept-Encoding allows gzip: a gzip entry decides, else a *
+    entry; q=0 means "not acceptable".
+    """
+    qualities = {encoding.lower(): quality for encoding, quality in request.accept_encodings}
+    return qualities.get("gzip", qualities.get("*", 0)) > 0
+
+def send_response_cell(cell):
+    """
+    Send a precompiled chat response, gzipped when the client accepts it.
+    """
+    if cell.gzip_body is None:
+        return Response(cell.body, mimetype="application/json")
+    if accepts_gzip():
+        response = Response(cell.gzip_body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
     else:
-        return RESPONSES["general"]["neutral"]
+        response = Response(cell.body, mimetype="application/json")
+    # Either body could have been sent, so caches must key on the header
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+def reset_conversation():
+    """
+    Drop the current conversation history and start a fresh one.
+    """
+    conversation_id = session.pop("conversation_id", None)
+    if conversation_id:
+        conversations.clear(conversation_id)
+
+def current_user_id():
+    # Sessions from before user_id was stored look it up once
+    if "user_id" not in session:
+        user = User.query.filter_by(email=session["email"]).first()
+        if user is None:
+            return None
+        session["user_id"] = user.id
+    return session["user_id"]
+
+def current_conversation_id():
+    if "conversation_id" not in session:
+        session["conversation_id"] = secrets.token_urlsafe(16)
+    return session["conversation_id"]
+
+def release_connections():
+    """
+    Close pooled database connections, e.g. in a preforking master before it
+    forks, so no connection is shared across processes.
+    """
+    with app.app_context():
+        db.engine.dispose()
+
+def shutdown_worker():
+    """
+    Run in a forked worker before it exits: flush what is still buffered in
+    memory, since the worker leaves through os._exit and atexit never runs.
+    """
+    history_writer.close()
+    rollups.close()
+
+def init_worker():
+    """
+    Run in each forked worker: drop database connections inherited from the
+    master without closing them (they belong to the parent), so every worker
+    opens its own.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+    conversations.after_fork()
 
 # Simple email validation using regex
 def is_valid_email(email):
     regex = r'^\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,4}\b'
     return re.match(regex, email) is not None
 
+@registry.register_collector
+def _password_metrics():
+    stats = password_hasher.stats
+    return [
+        ("calmora_password_seconds_total", "counter", "Time spent hashing and verifying passwords.",
+         [({"op": "hash"}, stats["hash_seconds"]), ({"op": "verify"}, stats["verify_seconds"])]),
+        ("calmora_password_ops_total", "counter", "Password hash and verify operations.",
+         [({"op": "hash"}, stats["hash_count"]), ({"op": "verify"}, stats["verify_count"])]),
+        ("calmora_password_rejected_total", "counter", "Password operations refused because the pool was full.",
+         stats["rejected"]),
+        ("calmora_password_queue_depth", "gauge", "Password operations running or waiting.", password_hasher.in_flight),
+    ]
+
+@registry.register_collector
+def _admission_metrics():
+    stats = chat_admission.stats
+    return [
+        ("calmora_chat_admitted_total", "counter", "Chat requests admitted to the NLU pipeline.", stats["admitted"]),
+        ("calmora_chat_shed_total", "counter", "Chat requests shed by admission control.",
+         [({"reason": "queue_full"}, stats["queue_full"]), ({"reason": "deadline"}, stats["deadline"])]),
+        ("calmora_chat_queued_seconds_total", "counter", "Time chat requests spent queued, shed ones included.",
+         stats["wait_seconds"]),
+        ("calmora_chat_active", "gauge", "Chat requests running NLU work.", chat_admission.active),
+        ("calmora_chat_queue_depth", "gauge", "Chat requests waiting for admission.", chat_admission.queued),
+    ]
+
+@registry.register_collector
+def _history_metrics():
+    stats = history_writer.stats
+    return [
+        ("calmora_history_rows_total", "counter", "Chat turns handed to the history writer, by outcome.",
+         [({"outcome": outcome}, stats[outcome])
+          for outcome in ("queued", "written", "failed", "rejected", "dropped")]),
+        ("calmora_history_batches_total", "counter", "Batches committed by the history writer.", stats["batches"]),
+        ("calmora_history_write_seconds_total", "counter", "Time spent committing history batches.",
+         stats["write_seconds"]),
+        ("calmora_history_queue_depth", "gauge", "Chat turns waiting to be written.", history_writer.depth),
+    ]
+
+@registry.register_collector
+def _startup_metrics():
+    return [
+        ("calmora_ready", "gauge", "Whether start-up warm-up has finished.", int(warmup.ready)),
+        ("calmora_startup_phase_seconds", "gauge", "Time each start-up phase took.",
+         [({"phase": phase, "status": status}, seconds) for phase, seconds, status in list(warmup.timings)]),
+    ]
+
+@registry.register_collector
+def _analytics_metrics():
+    stats = rollups.stats
+    return [
+        ("calmora_analytics_turns_recorded_total", "counter", "Chat turns counted into the analytics rollups.",
+         stats["recorded"]),
+        ("calmora_analytics_rows_written_total", "counter", "Rollup rows added onto the database.",
+         stats["rows_written"]),
+        ("calmora_analytics_flush_failures_total", "counter", "Rollup flushes that failed and were retried.",
+         stats["failed"]),
+        ("calmora_analytics_pending_rows", "gauge", "Rollup counters waiting for the next flush.", rollups.pending),
+    ]
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+# Probes and metrics never wait on start-up
+STARTUP_EXEMPT_ENDPOINTS = ("healthz", "ready", "metrics")
+
+@app.before_request
+def wait_for_database():
+    # Requests arriving while the tables are still being created wait for them
+    if request.endpoint not in STARTUP_EXEMPT_ENDPOINTS and not warmup.wait_for("database", timeout=10):
+        return busy_response()
+
+@app.after_request
+def record_request(response):
+    if registry.enabled and "request_start" in g:
+        registry.observe(REQUEST_SECONDS, time.perf_counter() - g.request_start,
+                         endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+def busy_response():
+    response = jsonify({"message": "The server is busy, please try again shortly."})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 # -------- Session Status Endpoint --------
 @app.route('/session-status', methods=["GET"])
 def session_status():
@@ -697,7 +476,12 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"message": "A user with this email already exists."}), 400
 
-    new_user = User(name=name, email=email, password_hash=generate_password_hash(password))
+    try:
+        password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return busy_response()
+
+    new_user = User(name=name, email=email, password_hash=password_hash)
     db.session.add(new_user)
     db.session.commit()
 
@@ -712,18 +496,30 @@ def login():
         return jsonify({"message": "Email and password are required."}), 400
 
     user = User.query.filter_by(email=email).first()
-    if user is None or not check_password_hash(user.password_hash, password):
-        return jsonify({"message": "Invalid email or password."}), 401
+    try:
+        if user is None or not password_hasher.verify(user.password_hash, password):
+            return jsonify({"message": "Invalid email or password."}), 401
+    except HasherBusy:
+        return busy_response()
+    # Upgrade hashes made with an older method or cost; when the hasher is
+    # busy, skip it and try again on a later login
+    if password_hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        except HasherBusy:
+            pass
 
     session.permanent = True  # Mark session as permanent to use the lifetime defined above
     session["email"] = email
-    session.pop("conversation", None)
+    session["user_id"] = user.id
+    reset_conversation()
     return jsonify({"message": "Login successful."}), 200
 
 @app.route('/logout', methods=["POST"])
 def logout():
     session.pop("email", None)
-    session.pop("conversation", None)
+    reset_conversation()
     return jsonify({"message": "Logged out successfully."}), 200
 
 # -------- Chat Endpoint (Requires Login) --------
@@ -731,33 +527,407 @@ def logout():
 def chat():
     if "email" not in session:
         return jsonify({"message": "Unauthorized. Please log in."}), 401
+    # A session whose user no longer exists can't keep history; make it log in again
+    user_id = current_user_id()
+    if user_id is None:
+        reset_conversation()
+        session.clear()
+        return jsonify({"message": "Unauthorized. Please log in."}), 401
 
     data = request.get_json()
     user_message = data.get("message", "").strip()
     if not user_message:
         return jsonify({"message": "Please provide a valid message."}), 400
 
-    intent = extract_intent(user_message)
-    sentiment = analyze_sentiment(user_message)
-    entities = extract_entities(user_message)
+    # Optional latency budget for the NLU pipeline, from the X-Latency-Budget-Ms
+    # header or "latency_budget_ms"; without one the deployment default applies
+    budget_ms = request.headers.get("X-Latency-Budget-Ms", data.get("latency_budget_ms"))
+    if budget_ms is not None:
+        try:
+            budget_ms = float(budget_ms)
+        except (TypeError, ValueError):
+            return jsonify({"message": "Please provide a valid latency budget."}), 400
+
+    # Normalized, lowercased and keyword-scanned once for every stage below.
+    # The whole turn is answered from one knowledge snapshot, even if the
+    # files are reloaded while it runs.
+    message = AnalyzedMessage(user_message)
+    message.knowledge = snapshot = knowledge.current
 
-    conversation = session.get("conversation", [])
-    if len(conversation) > 4:
-        conversation = conversation[-4:]
-    conversation.append({"user": user_message, "intent": intent, "sentiment": sentiment})
-    session["conversation"] = conversation
+    # Crisis messages are answered from the pre-screen, ahead of the regular pipeline,
+    # and are never shed; everything else goes through admission control
+    analysis = analyze_crisis(message)
+    if analysis is None:
+        try:
+            with chat_admission.admit() as waited:
+                registry.observe(ADMISSION_WAIT_SECONDS, waited)
+                with registry.time(STAGE_SECONDS, stage="analysis"):
+                    analysis = analyze_message(message, budget_ms)
+        except (AdmissionRejected, NLUWorkerUnavailable):
+            return busy_response()
+    intent = analysis["intent"]
+    sentiment = analysis["sentiment"]  # None when the crisis path or the tier skipped it
+    entities = analysis["entities"]
+
+    # The turn is folded into the conversation state, so a vague message after
+    # several on one topic is still answered for that topic
+    conversation_id = current_conversation_id()
+    state = conversations.get_state(conversation_id)
+    with registry.time(STAGE_SECONDS, stage="response"):
+        response_intent, response_sentiment = conversation_context.observe(state, intent, sentiment)
+        # Response text, with any follow-up question, comes precompiled from the table
+        cell = snapshot["responses"].lookup(response_intent, response_sentiment)
+        response_text = cell.message
+
+    # Durable history is written behind the request; if the writer has fallen
+    # too far behind, push back on the client rather than buffer without bound.
+    # Crisis replies are never refused: their turn is dropped (and counted) instead.
+    now = datetime.now(timezone.utc)
+    if app.config["CHAT_HISTORY"]:
+        try:
+            history_writer.put({
+                "conversation_id": conversation_id,
+                "user_id": user_id,
+                "created_at": now,
+                "content": user_message,
+                "intent": intent,
+                "sentiment": sentiment,
+                "response_id": cell.key,
+            }, drop_when_full=bool(analysis.get("crisis")))
+        except HistoryBackpressure:
+            return busy_response()
+
+    with registry.time(STAGE_SECONDS, stage="history"):
+        conversations.append(
+            conversation_id,
+            {"user": user_message, "intent": intent, "sentiment": sentiment},
+            {"advisor": response_text},
+            state=state,
+        )
+    registry.inc(CHAT_RESPONSES, intent=response_intent, sentiment=sentiment_bucket(response_sentiment))
+    # Counted like the stored turn (the message's own intent and sentiment),
+    # so the rollups can be rebuilt from history
+    if app.config["ANALYTICS"]:
+        rollups.record(now, intent, sentiment_bucket(sentiment), sentiment)
+
+    response = send_response_cell(cell)
+    # Which pipeline tier produced the answer ("crisis" for the pre-screen)
+    # and which version of the keywords and templates
+    response.headers["X-Calmora-NLU-Tier"] = analysis["tier"]
+    response.headers["X-Calmora-Knowledge-Version"] = snapshot.version
+    return response
+
+# -------- Chat History Endpoint (Requires Login) --------
+@app.route('/history', methods=["GET"])
+def history():
+    if "email" not in session:
+        return jsonify({"message": "Unauthorized. Please log in."}), 401
+
+    # SQLite treats a negative LIMIT as none at all
+    limit = max(1, min(request.args.get("limit", 20, type=int), 200))
+    # Newest first, straight off the (user_id, created_at) index. Turns still
+    # waiting in the write-behind queue show up once they are flushed.
+    messages = (Message.query.filter_by(user_id=current_user_id())
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(limit).all())
+    return jsonify({"messages": [
+        {"conversation_id": m.conversation_id, "created_at": m.created_at.isoformat(),
+         "message": m.content, "intent": m.intent, "sentiment": m.sentiment, "response_id": m.response_id}
+        for m in messages
+    ]}), 200
+
+def history_pages(user_id, after=None, limit=None, page_size=500):
+    """
+    Yield a user's stored turns oldest first, one page at a time, using
+    keyset pagination on (created_at, id) so each page is an index range
+    scan and memory stays flat however long the history is.
+    """
+    table = Message.__table__
+    remaining = limit
+    while remaining is None or remaining > 0:
+        query = select(table).where(table.c.user_id == user_id)
+        if after is not None:
+            created_at, message_id = after
+            query = query.where(or_(table.c.created_at > created_at,
+                                    and_(table.c.created_at == created_at, table.c.id > message_id)))
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = db.session.execute(query.order_by(table.c.created_at, table.c.id).limit(size)).all()
+        if not page:
+            return
+        yield page
+        if len(page) < size:
+            return
+        after = (page[-1].created_at, page[-1].id)
+        if remaining is not None:
+            remaining -= len(page)
+
+# -------- Chat History Export Endpoint (Requires Login) --------
+@app.route('/history/export', methods=["GET"])
+def export_history():
+    """
+    Stream the logged-in user's turns as NDJSON (default) or CSV
+    (?format=csv), oldest first. Every row carries a cursor; pass the last
+    one received as ?cursor= to resume after it. ?limit= caps the rows sent.
+    Gzipped on the fly for clients that accept it.
+    """
+    if "email" not in session:
+        return jsonify({"message": "Unauthorized. Please log in."}), 401
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "Format must be ndjson or csv."}), 400
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"])
+        except InvalidCursor:
+            return jsonify({"message": "Invalid cursor."}), 400
+    limit = request.args.get("limit", type=int)
+
+    pages = history_pages(current_user_id(), after, limit, app.config["EXPORT_PAGE_SIZE"])
+    chunks = format_pages(pages, fmt)
+    headers = {"Content-Disposition": f"attachment; filename=calmora-history.{fmt}",
+               "Vary": "Accept-Encoding"}
+    if accepts_gzip():
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[fmt], headers=headers)
+
+# -------- Analytics Endpoint (Requires Login) --------
+ANALYTICS_GRANULARITIES = ("hour", "day")
+
+def parse_utc(value):
+    """
+    ISO 8601 timestamp as a naive UTC datetime, the way rollup hours are stored.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@app.route('/analytics', methods=["GET"])
+def analytics():
+    """
+    Turns per intent and period between ?start= and ?end= (ISO 8601, UTC
+    unless an offset is given; default the last 24 hours), with counts per
+    sentiment bucket, the negative share and the mean sentiment. Optional
+    ?granularity=day and repeated ?intent= filters. Served from the rollup
+    table alone; the latest flush interval may not be in it yet.
+    """
+    if "email" not in session:
+        return jsonify({"message": "Unauthorized. Please log in."}), 401
+    if session["email"].lower() not in app.config["ANALYTICS_VIEWERS"]:
+        return jsonify({"message": "Analytics are only available to clinical staff."}), 403
+
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in ANALYTICS_GRANULARITIES:
+        return jsonify({"message": "Granularity must be hour or day."}), 400
+    try:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        end = parse_utc(request.args["end"]) if request.args.get("end") else now
+        start = parse_utc(request.args["start"]) if request.args.get("start") else end - timedelta(hours=24)
+    except ValueError:
+        return jsonify({"message": "Start and end must be ISO 8601 timestamps."}), 400
+    if start >= end:
+        return jsonify({"message": "Start must be before end."}), 400
+
+    table = IntentRollup.__table__
+    period = table.c.hour if granularity == "hour" else func.date(table.c.hour)
+    query = (select(period, table.c.intent, table.c.sentiment, func.sum(table.c.turns), func.sum(table.c.sentiment_sum))
+             .where(table.c.hour >= hour_bucket(start), table.c.hour < end)
+             .group_by(period, table.c.intent, table.c.sentiment)
+             .order_by(period, table.c.intent))
+    intents = request.args.getlist("intent")
+    if intents:
+        query = query.where(table.c.intent.in_(intents))
+    rows = [(p.isoformat() if isinstance(p, datetime) else p, intent, bucket, turns, sentiment_sum)
+            for p, intent, bucket, turns, sentiment_sum in db.session.execute(query)]
+    return jsonify({
+        "start": hour_bucket(start).isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "results": rollup_rows(rows, granularity),
+    }), 200
+
+# -------- Batch Chat Endpoint (Requires Login) --------
+@app.route('/chat/batch', methods=["POST"])
+def chat_batch():
+    if "email" not in session:
+        return jsonify({"message": "Unauthorized. Please log in."}), 401
+
+    data = request.get_json()
+    messages = data.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return jsonify({"message": "Please provide a non-empty list of messages."}), 400
+    if len(messages) > app.config["CHAT_BATCH_MAX_MESSAGES"]:
+        return jsonify({"message": f"At most {app.config['CHAT_BATCH_MAX_MESSAGES']} messages per batch."}), 400
+
+    user_messages = []
+    for i, message in enumerate(messages):
+        message = message.strip() if isinstance(message, str) else ""
+        if not message:
+            return jsonify({"message": f"Message {i} is not a valid message."}), 400
+        user_messages.append(message)
+
+    # Batch requests are stateless: they don't touch the session conversation.
+    # Every message is analyzed and answered with the same knowledge snapshot.
+    snapshot = knowledge.current
+    analyzed = []
+    for user_message in user_messages:
+        message = AnalyzedMessage(user_message)
+        message.knowledge = snapshot
+        analyzed.append(message)
+    try:
+        analyses = analyze_batch(analyzed, app.config["NLP_BATCH_SIZE"])
+    except NLUWorkerUnavailable:
+        return busy_response()
+
+    results = []
+    for analysis in analyses:
+        cell = snapshot["responses"].lookup(analysis["intent"], analysis["sentiment"])
+        results.append({**analysis, "message": cell.message})
+
+    response = jsonify({"results": results})
+    response.headers["X-Calmora-Knowledge-Version"] = snapshot.version
+    return response
+
+# -------- Health Endpoints --------
+@app.route('/healthz', methods=["GET"])
+def healthz():
+    """
+    Liveness: the process is serving. Only a failed start-up makes it 503.
+    """
+    if warmup.state == "failed":
+        return jsonify({"status": "failed", "error": warmup.error}), 503
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/ready', methods=["GET"])
+def ready():
+    """
+    Readiness: 200 once models are loaded and warmed, 503 until then, with
+    the per-phase start-up breakdown either way.
+    """
+    report = dict(warmup.report(), knowledge_version=knowledge.current.version)
+    return jsonify(report), 200 if warmup.ready else 503
+
+# -------- Bulk User Import (CLI) --------
+@app.cli.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), help="default: from the file extension")
+@click.option("--chunk-size", default=500, show_default=True, help="rows checked, hashed and inserted together")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="password hashing processes")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False),
+              help="write rejected rows to this CSV instead of stderr")
+def import_users_command(path, fmt, chunk_size, workers, errors_path):
+    """
+    Create users in bulk from a CSV (name,email,password header) or JSON Lines
+    file, with the same validation as /register. Existing emails are skipped.
+    Run with CALMORA_WARMUP=off so no models are loaded alongside.
+    """
+    if not warmup.wait_for("database"):
+        raise click.ClickException(f"database set-up failed: {warmup.error}")
+    hasher = PasswordHasher(method=app.config["PASSWORD_HASH_METHOD"], pool_size=workers)
+    users = User.__table__
+
+    def existing_emails(emails):
+        rows = db.session.execute(select(users.c.email).where(users.c.email.in_(emails)))
+        return {row.email for row in rows}
+
+    def insert_users(rows):
+        # A user registered concurrently since the check is left alone; the
+        # salted hashes tell which rows are ours
+        db.session.execute(sqlite_insert(users).on_conflict_do_nothing(index_elements=["email"]), rows)
+        db.session.commit()
+        ours = {row["email"]: row["password_hash"] for row in rows}
+        stored = db.session.execute(select(users.c.email, users.c.password_hash)
+                                    .where(users.c.email.in_(list(ours))))
+        return {row.email for row in stored if ours[row.email] == row.password_hash}
+
+    def progress(report):
+        click.echo(f"\r{report.read} rows, {report.created} created ({report.rows_per_second:.0f} rows/s)",
+                   nl=False, err=True)
+
+    errors_file = open(errors_path, "w", newline="") if errors_path else None
+    errors = csv.writer(errors_file) if errors_file else None
+    if errors:
+        errors.writerow(["line", "email", "error"])
+
+    def on_error(line, email, error):
+        if errors:
+            errors.writerow([line, email, error])
+        else:
+            click.echo(f"line {line}: {email or '-'}: {error}", err=True)
+
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            records = read_users(f, fmt or detect_format(path))
+            report = import_users(records, existing_emails, hasher.hash_many, insert_users, on_error,
+                                  is_valid_email, chunk_size=chunk_size, on_chunk=progress)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        hasher.shutdown()
+        if errors_file:
+            errors_file.close()
+    click.echo(err=True)
+    click.echo(report.summary())
+    # Skipped existing users are expected on a re-run; invalid rows are not
+    if report.invalid:
+        sys.exit(1)
+
+@app.cli.command("rebuild-analytics")
+@click.option("--since", type=click.DateTime(), help="only rebuild hours from this time (UTC) on; default: all")
+def rebuild_analytics_command(since):
+    """
+    Recompute the analytics rollups from stored chat history in one set-based
+    INSERT ... SELECT. Turns counted by running servers but not yet written to
+    history are not included, so run it while /chat is quiet.
+    """
+    if not warmup.wait_for("database"):
+        raise click.ClickException(f"database set-up failed: {warmup.error}")
+    rollup, message = IntentRollup.__table__, Message.__table__
+    # Same string SQLAlchemy stores for a whole-hour DateTime, so rebuilt rows
+    # and later /chat flushes land on the same keys
+    hour = func.strftime("%Y-%m-%d %H:00:00.000000", message.c.created_at)
+    # select_response's +/-0.3 thresholds, as in sentiment_bucket()
+    bucket = case(
+        (message.c.sentiment.is_(None), "unscored"),
+        (message.c.sentiment >= 0.3, "positive"),
+        (message.c.sentiment <= -0.3, "negative"),
+        else_="neutral",
+    )
+    query = select(hour, message.c.intent, bucket, func.count(), func.coalesce(func.sum(message.c.sentiment), 0.0))
+    delete = rollup.delete()
+    if since is not None:
+        since = hour_bucket(since)
+        query = query.where(message.c.created_at >= since)
+        delete = delete.where(rollup.c.hour >= since)
+    query = query.group_by(hour, message.c.intent, bucket)
+    start = time.perf_counter()
+    with db.engine.begin() as conn:
+        conn.execute(delete)
+        result = conn.execute(rollup.insert().from_select(
+            ["hour", "intent", "sentiment", "turns", "sentiment_sum"], query))
+    click.echo(f"rebuilt {result.rowcount} rollup rows in {time.perf_counter() - start:.2f}s")
 
-    response_text = select_response(intent, sentiment, user_message)
-    
-    # Add follow-up question if appropriate
-    follow_up = get_follow_up_question(intent)
-    if follow_up:
-        response_text += f"\n\n{follow_up}"
-    
-    conversation.append({"advisor": response_text})
-    session["conversation"] = conversation
+# -------- Metrics Endpoint --------
+@app.route('/metrics', methods=["GET"])
+def metrics():
+    if not registry.enabled:
+        return jsonify({"message": "Metrics are disabled."}), 404
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
-    return jsonify({"message": response_text})
+# Everything above ran at import time; the remaining phases are timed one by one
+warmup.mark("import")
+warmup.add("database", init_database)
+if app.config["WARMUP"] != "off":
+    for name, fn in warmup_phases():
+        warmup.add(name, fn)
+if app.config["WARMUP"] == "background":
+    warmup.start()
+else:
+    warmup.run()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # threaded: lightweight endpoints get their own threads while /chat waits on the NLU pool
+    app.run(debug=True, threaded=True)
\ No newline at end of file
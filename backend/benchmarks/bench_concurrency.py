@@ -0,0 +1,92 @@
+# backend/benchmarks/bench_concurrency.py
+#
+# Throughput and tail latency of /chat against NLU pool size, while a probe
+# keeps hitting /session-status to show whether cheap endpoints queue behind
+# NLU work. The analysis cache is disabled so every request does real work.
+#
+#   cd backend && python benchmarks/bench_concurrency.py --pool-sizes 0,1,2,4,8
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["CALMORA_NLU_CACHE_SIZE"] = "0"
+
+from clients import logged_in_client  # noqa: E402
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000
+
+
+def run(app, make_message, clients, requests_per_client, words, seed):
+    chat_latencies, probe_latencies, failures = [], [], []
+    done = threading.Event()
+
+    def chat_worker(i):
+        rng = random.Random(seed + i)
+        client = logged_in_client(app)
+        for _ in range(requests_per_client):
+            message = make_message(rng, words)
+            start = time.perf_counter()
+            response = client.post("/chat", json={"message": message})
+            chat_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    def probe():
+        client = logged_in_client(app)
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/session-status")
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    probe_thread = threading.Thread(target=probe)
+    workers = [threading.Thread(target=chat_worker, args=(i,)) for i in range(clients)]
+    probe_thread.start()
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    probe_thread.join()
+    assert not failures, f"/chat answered {sorted(set(failures))}"
+    return len(chat_latencies) / elapsed, chat_latencies, probe_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pool-sizes", default="0,1,2,4,8")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=25, help="requests per client")
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--entity-mode", default=None, help="override CALMORA_ENTITY_MODE")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.entity_mode:
+        os.environ["CALMORA_ENTITY_MODE"] = args.entity_mode
+    import nlu_utils
+    from app import app
+    from corpus import make_message
+
+    nlu_utils.extract_entities("warm up the model")
+    print(f"{'pool':>5} {'chat req/s':>11} {'chat p50 ms':>12} {'chat p99 ms':>12} {'status p99 ms':>14}")
+    for pool_size in (int(x) for x in args.pool_sizes.split(",")):
+        nlu_utils.configure_executor(pool_size)
+        rps, chat, probe = run(app, make_message, args.clients, args.requests, args.words, args.seed)
+        print(f"{pool_size:>5} {rps:>11.1f} {percentile(chat, 50):>12.1f} "
+              f"{percentile(chat, 99):>12.1f} {percentile(probe, 99):>14.1f}")
+    nlu_utils.configure_executor(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_crisis.py
+#
+# Latency of crisis (suicide / self-harm) messages through /chat while normal
+# traffic keeps the NLU pool busy. Exits 1 if the crisis p99 misses the target.
+# Everything runs in one process, so past a few load clients the crisis p99 is
+# set by GIL scheduling against the other request threads, not by queueing.
+#
+#   cd backend && python benchmarks/bench_crisis.py [--target-ms 25 --load-clients 2]
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["CALMORA_NLU_CACHE_SIZE"] = "0"
+
+CRISIS_MESSAGES = (
+    "I want to die", "I can't go on anymore", "Sometimes I think everyone is better off dead",
+    "I keep cutting and I want to hurt myself", "I have been burning myself again",
+    "honestly I just want to end my life tonight",
+)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target-ms", type=float, default=25.0, help="crisis p99 latency target")
+    parser.add_argument("--load-clients", type=int, default=2)
+    parser.add_argument("--crisis-requests", type=int, default=300)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--words", type=int, default=120, help="length of background messages")
+    parser.add_argument("--entity-mode", default=None, help="override CALMORA_ENTITY_MODE")
+    args = parser.parse_args()
+
+    if args.entity_mode:
+        os.environ["CALMORA_ENTITY_MODE"] = args.entity_mode
+    import nlu_utils
+    from app import app
+    from clients import logged_in_client
+    from corpus import make_message
+
+    nlu_utils.configure_executor(args.pool_size)
+    nlu_utils.extract_entities("warm up the model")
+
+    done = threading.Event()
+    load_latencies, load_failures = [], []
+
+    def background(seed):
+        rng = random.Random(seed)
+        client = logged_in_client(app)
+        while not done.is_set():
+            start = time.perf_counter()
+            response = client.post("/chat", json={"message": make_message(rng, args.words)})
+            load_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                load_failures.append(response.status_code)
+
+    workers = [threading.Thread(target=background, args=(i,)) for i in range(args.load_clients)]
+    for t in workers:
+        t.start()
+    time.sleep(0.5)
+
+    client = logged_in_client(app)
+    crisis_latencies = []
+    try:
+        for i in range(args.crisis_requests):
+            start = time.perf_counter()
+            response = client.post("/chat", json={"message": CRISIS_MESSAGES[i % len(CRISIS_MESSAGES)]})
+            crisis_latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+    finally:
+        done.set()
+        for t in workers:
+            t.join()
+    assert not load_failures, f"background /chat answered {sorted(set(load_failures))}"
+    nlu_utils.configure_executor(0)
+
+    p99 = percentile(crisis_latencies, 99)
+    print(f"background /chat: n={len(load_latencies)} p50 {percentile(load_latencies, 50):.2f} ms "
+          f"p99 {percentile(load_latencies, 99):.2f} ms")
+    print(f"crisis /chat:     n={len(crisis_latencies)} p50 {percentile(crisis_latencies, 50):.2f} ms "
+          f"p99 {p99:.2f} ms (target {args.target_ms:.1f} ms)")
+    if p99 > args.target_ms:
+        print("FAIL: crisis p99 above target")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
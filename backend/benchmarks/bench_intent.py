@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_intent.py
+#
+# Per-message cost of extract_intent against message length, comparing the
+# original per-keyword regex loop with the compiled single-pass matcher.
+#
+#   cd backend && python benchmarks/bench_intent.py [--repeat 200]
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlu_utils import knowledge, extract_intent  # noqa: E402
+from nlu_cache import normalize_message  # noqa: E402
+from corpus import make_message  # noqa: E402
+
+INTENT_KEYWORDS = knowledge.current["intents"].keywords
+
+# Messages are whitespace-normalized before matching, so a multi-word keyword
+# split by a run of whitespace now matches; the legacy loop missed it.
+WHITESPACE_CASES = [
+    ("I want to self  harm", "self_harm", "general"),
+    ("thinking about\tself\nharm again", "self_harm", "general"),
+]
+
+
+def with_random_whitespace(rng, message):
+    return "".join(rng.choice((" ", "  ", "\t", "\n ")) if ch == " " else ch for ch in message)
+
+
+def legacy_extract_intent(user_message):
+    """
+    The original implementation, kept here as the baseline.
+    """
+    lower_msg = user_message.lower()
+    for keyword in INTENT_KEYWORDS["suicide"]:
+        if keyword in lower_msg:
+            return "suicide"
+    matches = {}
+    for intent, keywords in INTENT_KEYWORDS.items():
+        count = 0
+        for keyword in keywords:
+            if re.search(r'\b' + re.escape(keyword) + r'\b', lower_msg):
+                count += 1
+        if count > 0:
+            matches[intent] = count
+    if matches:
+        return max(matches.items(), key=lambda x: x[1])[0]
+    return "general"
+
+
+def per_message_us(fn, messages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for msg in messages:
+            fn(msg)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--lengths", default="5,20,50,100,250,500,1000")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    # Equivalence check over a randomized corpus before timing anything
+    corpus = [make_message(rng, rng.randint(1, 80), allow_suicide=True) for _ in range(2000)]
+    mismatches = [m for m in corpus if legacy_extract_intent(m) != extract_intent(m)]
+    # With irregular whitespace, the compiled path must agree with the legacy
+    # loop on the normalized message
+    spaced = [with_random_whitespace(rng, m) for m in corpus]
+    mismatches += [m for m in spaced if legacy_extract_intent(normalize_message(m)) != extract_intent(m)]
+    if mismatches:
+        print(f"MISMATCH on {len(mismatches)} messages, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    for message, expected, legacy in WHITESPACE_CASES:
+        got, got_legacy = extract_intent(message), legacy_extract_intent(message)
+        if (got, got_legacy) != (expected, legacy):
+            print(f"MISMATCH on {message!r}: {got} (legacy {got_legacy}), expected {expected} (legacy {legacy})")
+            sys.exit(1)
+    print(f"equivalence: {len(corpus) + len(spaced)} messages OK, "
+          f"{len(WHITESPACE_CASES)} whitespace-normalization differences as expected\n")
+
+    print(f"{'words':>6} {'legacy us/msg':>14} {'compiled us/msg':>16} {'speedup':>8}")
+    for n_words in (int(x) for x in args.lengths.split(",")):
+        messages = [make_message(rng, n_words) for _ in range(20)]
+        old = per_message_us(legacy_extract_intent, messages, args.repeat)
+        new = per_message_us(extract_intent, messages, args.repeat)
+        print(f"{n_words:>6} {old:>14.1f} {new:>16.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
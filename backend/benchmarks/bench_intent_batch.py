@@ -0,0 +1,63 @@
+# backend/benchmarks/bench_intent_batch.py
+#
+# Bulk intent classification (e.g. rescoring archived messages): the regex
+# matcher one message at a time against the sparse-matrix scorer on the
+# whole batch. Checks both agree on every message first.
+#
+#   cd backend && python benchmarks/bench_intent_batch.py [--messages 100000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlu_utils import knowledge  # noqa: E402
+from intent_matrix import SparseIntentScorer  # noqa: E402
+from corpus import make_message  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--max-words", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    intent_matcher = knowledge.current["intents"].matcher
+    scorer = SparseIntentScorer(knowledge.current["intents"].keywords, priority_intent="suicide")
+
+    # Equivalence on counts and on the classification rules, including
+    # keywords glued to punctuation and non-ASCII text
+    sample = [make_message(rng, rng.randint(1, 80), allow_suicide=True).lower() for _ in range(5000)]
+    sample += [msg.replace(" ", rng.choice(("-", "'", "’", ", ", " é "))) for msg in sample[:1000]]
+    scores = scorer.scores(sample)
+    for msg, row, intent in zip(sample, scores, scorer.classify_batch(sample)):
+        counts = {i: int(c) for i, c in zip(scorer.intents, row) if c}
+        if counts != intent_matcher.intent_counts(msg) or intent != intent_matcher.classify(msg):
+            print(f"MISMATCH on {msg!r}")
+            sys.exit(1)
+    print(f"equivalence: {len(sample)} messages OK\n")
+
+    messages = [make_message(rng, rng.randint(3, args.max_words), allow_suicide=True).lower()
+                for _ in range(args.messages)]
+
+    start = time.perf_counter()
+    regex = [intent_matcher.classify(msg) for msg in messages]
+    regex_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = scorer.classify_batch(messages)
+    matrix_seconds = time.perf_counter() - start
+
+    assert regex == matrix
+    print(f"{'engine':<8} {'seconds':>9} {'msgs/s':>10}")
+    print(f"{'regex':<8} {regex_seconds:>9.2f} {len(messages) / regex_seconds:>10.0f}")
+    print(f"{'matrix':<8} {matrix_seconds:>9.2f} {len(messages) / matrix_seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/benchmarks/bench_responses.py
+#
+# Checks that the precompiled response table answers exactly like the original
+# select_response + jsonify for every intent and sentiment bucket edge, then
+# compares the per-response cost of the two.
+#
+#   cd backend && python benchmarks/bench_responses.py
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CALMORA_ENTITY_MODE", "off")
+
+SENTIMENTS = (-1.0, -0.5, -0.3, -0.2999, 0.0, 0.2999, 0.3, 0.5, 1.0)
+
+
+def legacy_select_response(responses, intent, sentiment):
+    """
+    The original select_response, kept here as the reference.
+    """
+    if intent in responses:
+        if intent == "suicide":
+            return responses[intent]["default"]
+        if intent in ["loneliness", "depression", "anxiety", "stress", "ptsd", "grief",
+                      "addiction", "relationship", "breakup", "insomnia", "eating_disorder",
+                      "self_harm", "substance_abuse", "bipolar", "schizophrenia", "ocd",
+                      "general", "burnout", "panic", "trauma"]:
+            if sentiment >= 0.3:
+                return responses[intent]["positive"]
+            elif sentiment <= -0.3:
+                return responses[intent]["negative"]
+            else:
+                return responses[intent]["neutral"]
+    if sentiment >= 0.3:
+        return responses["general"]["positive"]
+    elif sentiment <= -0.3:
+        return responses["general"]["negative"]
+    else:
+        return responses["general"]["neutral"]
+
+
+def load_responses():
+    from nlu_utils import KNOWLEDGE_DIR
+
+    with open(os.path.join(KNOWLEDGE_DIR, "responses.json")) as f:
+        return json.load(f)
+
+
+def check_equivalence(app_module, data):
+    from flask import jsonify
+    from response_table import ResponseTable
+
+    table = ResponseTable(
+        data["responses"], data["sentiment_intents"],
+        encode=lambda message: app_module.app.json.response({"message": message}).get_data(),
+        follow_up=app_module.get_follow_up_question, gzip_bodies=True,
+    )
+    responses = data["responses"]
+    intents = list(responses) + ["not_an_intent"]
+    checked = 0
+    with app_module.app.app_context():
+        for intent in intents:
+            for sentiment in SENTIMENTS:
+                expected = legacy_select_response(responses, intent, sentiment)
+                cell = table.lookup(intent, sentiment)
+                assert app_module.select_response(intent, sentiment, "") == expected, (intent, sentiment)
+                assert cell.body == jsonify({"message": cell.message}).get_data(), (intent, sentiment)
+                assert gzip.decompress(cell.gzip_body) == cell.body, (intent, sentiment)
+                checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    import app as app_module
+    from flask import jsonify
+
+    data = load_responses()
+    responses = data["responses"]
+    print(f"equivalence: {check_equivalence(app_module, data)} (intent, sentiment) cases OK\n")
+
+    cases = [(intent, s) for intent in responses for s in (-0.6, 0.0, 0.6)]
+    response_table = app_module.knowledge.current["responses"]
+    with app_module.app.test_request_context("/chat", method="POST"):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for intent, sentiment in cases:
+                jsonify({"message": legacy_select_response(responses, intent, sentiment)}).get_data()
+        legacy = (time.perf_counter() - start) / (args.repeat * len(cases)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for intent, sentiment in cases:
+                app_module.send_response_cell(response_table.lookup(intent, sentiment)).get_data()
+        table = (time.perf_counter() - start) / (args.repeat * len(cases)) * 1e6
+
+    print(f"select_response + jsonify: {legacy:8.2f} us/response")
+    print(f"table lookup + send:       {table:8.2f} us/response  ({legacy / table:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# backend/benchmarks/clients.py
+#
+# Logged-in test clients for the in-process /chat benchmarks. /chat turns
+# away sessions whose user does not exist, so the benchmark user is created
+# in the configured database on first use.
+
+import os
+import secrets
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_EMAIL = "bench@example.com"
+
+
+def bench_user_id():
+    from werkzeug.security import generate_password_hash
+
+    from app import User, app, db, warmup
+
+    if not warmup.wait_for("database"):
+        raise RuntimeError(f"database set-up failed: {warmup.error}")
+    with app.app_context():
+        user = User.query.filter_by(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User(name="Benchmark", email=BENCH_EMAIL,
+                        password_hash=generate_password_hash(secrets.token_urlsafe(16)))
+            db.session.add(user)
+            db.session.commit()
+        return user.id
+
+
+def logged_in_client(app):
+    user_id = bench_user_id()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["email"] = BENCH_EMAIL
+        sess["user_id"] = user_id
+    return client
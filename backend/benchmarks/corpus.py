@@ -0,0 +1,85 @@
+# backend/benchmarks/corpus.py
+#
+# Deterministic synthetic chat messages built from the intent keywords, for the
+# benchmarks in this directory. The same seed always yields the same corpus.
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlu_utils import knowledge  # noqa: E402
+
+INTENT_KEYWORDS = knowledge.current["intents"].keywords
+
+FILLER = ("i", "have", "been", "feeling", "really", "today", "and", "it", "is", "just",
+          "so", "much", "with", "work", "my", "family", "lately", "the", "week", "honestly")
+
+POLARITY_PHRASES = {
+    "positive": ("i feel hopeful", "things are getting better", "thank you so much",
+                 "i am grateful", "it was a good day", "i feel calm"),
+    "neutral": ("i am not sure", "it happens sometimes", "i went to the store",
+                "we talked about it", "that was on tuesday"),
+    "negative": ("this is terrible", "i feel awful", "everything is horrible",
+                 "i hate this", "it hurts so bad", "i am miserable"),
+}
+
+# Relative weight of each intent in a corpus; "general" means no keywords at all
+INTENT_MIXES = {
+    "uniform": {intent: 1 for intent in list(INTENT_KEYWORDS) + ["general"]},
+    "common": {"anxiety": 5, "depression": 5, "stress": 4, "loneliness": 4, "insomnia": 3,
+               "relationship": 2, "grief": 2, "general": 5, "suicide": 1, "self_harm": 1},
+    "crisis": {"suicide": 3, "self_harm": 2, "depression": 1, "general": 1},
+    "general": {"general": 1},
+}
+
+
+def make_message(rng, n_words, keyword_rate=0.08, allow_suicide=False):
+    """
+    A message of n_words filler words with keywords from random intents mixed in.
+    """
+    intents = [i for i in INTENT_KEYWORDS if allow_suicide or i != "suicide"]
+    words = []
+    while len(words) < n_words:
+        if rng.random() < keyword_rate:
+            words.extend(rng.choice(INTENT_KEYWORDS[rng.choice(intents)]).split())
+        else:
+            words.append(rng.choice(FILLER))
+    return " ".join(words[:n_words]).capitalize() + "."
+
+
+def make_targeted_message(rng, intent, polarity, n_words):
+    """
+    A message about one intent with a sentiment-bearing phrase, padded to n_words.
+    """
+    words = rng.choice(POLARITY_PHRASES[polarity]).split()
+    if intent != "general":
+        words += rng.choice(INTENT_KEYWORDS[intent]).split()
+    while len(words) < n_words:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLER))
+    return " ".join(words).capitalize() + "."
+
+
+def build_corpus(size=500, seed=7, mix="common", lengths=(3, 12, 40, 120),
+                 polarities=("positive", "neutral", "negative")):
+    """
+    Return a list of {"message", "intent", "polarity", "words"} dicts.
+    "intent" is the intent the message was generated for; a message may
+    contain other keywords by chance, so it is a label, not ground truth.
+    """
+    rng = random.Random(seed)
+    weights = INTENT_MIXES[mix]
+    intents, intent_weights = list(weights), list(weights.values())
+    corpus = []
+    for _ in range(size):
+        intent = rng.choices(intents, intent_weights)[0]
+        polarity = rng.choice(polarities)
+        n_words = rng.choice(lengths)
+        corpus.append({
+            "message": make_targeted_message(rng, intent, polarity, n_words),
+            "intent": intent,
+            "polarity": polarity,
+            "words": n_words,
+        })
+    return corpus
@@ -0,0 +1,206 @@
+# backend/benchmarks/loadtest.py
+#
+# Load generator for a locally running backend. Each virtual user registers,
+# logs in and holds a multi-turn /chat conversation with think-times between
+# turns; results are reported per endpoint overall and per time window.
+# Uses only the standard library.
+#
+#   cd backend
+#   python benchmarks/loadtest.py --users 20 --duration 60              # server already running
+#   python benchmarks/loadtest.py --spawn --workers 2 --users 20       # start serve.py for the run
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import INTENT_MIXES, make_targeted_message  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    """
+    Collects (time offset, endpoint, latency, ok) samples from all users.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+        self.start = time.monotonic()
+
+    def record(self, endpoint, latency, ok):
+        with self._lock:
+            self.samples.append((time.monotonic() - self.start, endpoint, latency, ok))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))] * 1000
+
+
+def summarize(samples, elapsed):
+    by_endpoint = {}
+    for _, endpoint, latency, ok in samples:
+        by_endpoint.setdefault(endpoint, []).append((latency, ok))
+    summary = {}
+    for endpoint, values in sorted(by_endpoint.items()):
+        latencies = sorted(latency for latency, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        summary[endpoint] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / len(values), 4),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    return summary
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, recorder, stop_at, args, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.args = args
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        mix = INTENT_MIXES[args.mix]
+        self.intents, self.weights = list(mix), list(mix.values())
+
+    def post(self, endpoint, payload, ok_statuses=(200, 201)):
+        request = urllib.request.Request(
+            self.base_url + endpoint, data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"}, method="POST")
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.args.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = None
+        self.recorder.record(endpoint, time.perf_counter() - start, status in ok_statuses)
+        return status
+
+    def think(self):
+        if self.args.think_time > 0:
+            time.sleep(min(self.rng.expovariate(1 / self.args.think_time), self.args.think_time * 5))
+
+    def run(self):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        password = "loadtest-pass"
+        self.post("/register", {"name": "Load Test", "email": email,
+                                "password": password, "confirm_password": password})
+        while time.monotonic() < self.stop_at:
+            if self.post("/login", {"email": email, "password": password}) != 200:
+                self.think()
+                continue
+            for _ in range(self.rng.randint(*self.args.turns)):
+                if time.monotonic() >= self.stop_at:
+                    break
+                self.think()
+                intent = self.rng.choices(self.intents, self.weights)[0]
+                polarity = self.rng.choice(("positive", "neutral", "negative"))
+                message = make_targeted_message(self.rng, intent, polarity, self.rng.choice((4, 12, 40)))
+                self.post("/chat", {"message": message})
+            self.post("/logout", {})
+
+
+def spawn_server(args):
+    command = [sys.executable, "serve.py", "--port", str(args.port), "--workers", str(args.workers),
+               "--no-access-log"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/ready", timeout=1).read()
+            return process
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    process.terminate()
+    raise SystemExit("server did not come up within 60s")
+
+
+def print_table(title, summary):
+    print(title)
+    print(f"  {'endpoint':<10} {'requests':>9} {'req/s':>8} {'errors':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, s in summary.items():
+        print(f"  {endpoint:<10} {s['requests']:>9} {s['rps']:>8.1f} {s['error_rate']:>7.1%} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="base URL (default http://127.0.0.1:<port>)")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--spawn", action="store_true", help="start serve.py for the duration of the run")
+    parser.add_argument("--workers", type=int, default=2, help="workers for --spawn")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users start")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--turns", type=int, nargs=2, default=(3, 8), metavar=("MIN", "MAX"),
+                        help="chat turns per login session")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between turns")
+    parser.add_argument("--mix", default="common", choices=sorted(INTENT_MIXES))
+    parser.add_argument("--interval", type=float, default=10.0, help="report window in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    base_url = (args.url or f"http://127.0.0.1:{args.port}").rstrip("/")
+    server = spawn_server(args) if args.spawn else None
+    try:
+        recorder = Recorder()
+        stop_at = recorder.start + args.duration
+        users = []
+        for i in range(args.users):
+            user = VirtualUser(base_url, recorder, stop_at, args, args.seed + i)
+            user.start()
+            users.append(user)
+            time.sleep(args.ramp_up / max(args.users, 1))
+        for user in users:
+            user.join(timeout=max(0.0, stop_at - time.monotonic()) + args.timeout)
+        elapsed = time.monotonic() - recorder.start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    samples = list(recorder.samples)
+    windows = []
+    start = 0.0
+    while start < elapsed:
+        in_window = [s for s in samples if start <= s[0] < start + args.interval]
+        windows.append({"start_s": start, "endpoints": summarize(in_window, min(args.interval, elapsed - start))})
+        start += args.interval
+
+    for window in windows:
+        print_table(f"[{window['start_s']:.0f}s - {window['start_s'] + args.interval:.0f}s]", window["endpoints"])
+    overall = summarize(samples, elapsed)
+    print_table(f"overall ({elapsed:.1f}s, {args.users} users)", overall)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k != "json"},
+                       "overall": overall, "windows": windows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
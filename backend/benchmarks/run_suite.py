@@ -0,0 +1,171 @@
+# backend/benchmarks/run_suite.py
+#
+# Times every nlu_utils stage, select_response and the full /chat handler over
+# a deterministic synthetic corpus and writes machine-readable results.
+# Runs offline; stages that need a missing spaCy model are reported as skipped.
+#
+#   cd backend
+#   python benchmarks/run_suite.py run --out results.json [--size 500 --mix common]
+#   python benchmarks/run_suite.py compare before.json after.json [--fail-above 10]
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+METRICS = ("ops_per_sec", "p50_ms", "p95_ms", "p99_ms")
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_samples, p):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p / 100))]
+
+
+def time_stage(fn, inputs, repeat):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            t0 = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        "n": len(samples),
+        "ops_per_sec": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_suite(args):
+    # The analysis cache would turn repeated corpus messages into dict lookups
+    os.environ["CALMORA_NLU_CACHE_SIZE"] = "0"
+    if args.entity_mode:
+        os.environ["CALMORA_ENTITY_MODE"] = args.entity_mode
+
+    import nlu_utils
+    from app import app, select_response
+    from clients import logged_in_client
+    from corpus import build_corpus
+
+    corpus = build_corpus(size=args.size, seed=args.seed, mix=args.mix)
+    messages = [item["message"] for item in corpus]
+    analyzed = [(nlu_utils.extract_intent(m), nlu_utils.analyze_sentiment(m), m) for m in messages]
+
+    client = logged_in_client(app)
+
+    def chat(message):
+        response = client.post("/chat", json={"message": message})
+        assert response.status_code == 200, response.status_code
+
+    stages = {
+        "extract_intent": (nlu_utils.extract_intent, messages),
+        "analyze_sentiment": (nlu_utils.analyze_sentiment, messages),
+        "extract_entities": (nlu_utils.extract_entities, messages),
+        "select_response": (lambda a: select_response(*a), analyzed),
+        "chat": (chat, messages),
+    }
+
+    results, skipped = {}, {}
+    for name, (fn, inputs) in stages.items():
+        if name == "chat" and "extract_entities" in skipped:
+            skipped[name] = "needs extract_entities"
+            continue
+        try:
+            fn(inputs[0])  # warm up, and load any lazy model outside the timing
+        except OSError as e:
+            skipped[name] = str(e).splitlines()[0]
+            continue
+        results[name] = time_stage(fn, inputs, args.repeat)
+        print(f"{name:>18}: {results[name]['ops_per_sec']:>10.1f} ops/s  "
+              f"p50 {results[name]['p50_ms']:.3f} ms  p99 {results[name]['p99_ms']:.3f} ms")
+    for name, reason in skipped.items():
+        print(f"{name:>18}: skipped ({reason})")
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "entity_mode": nlu_utils.entity_extractor.mode,
+            "corpus": {"size": args.size, "seed": args.seed, "mix": args.mix},
+            "repeat": args.repeat,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(before, after, fail_above=None):
+    """
+    Print per-stage changes from before to after. Returns the stages whose
+    throughput dropped or p99 grew by more than fail_above percent.
+    """
+    regressions = []
+    print(f"{'stage':>18} {'metric':>12} {'before':>12} {'after':>12} {'change':>9}")
+    for stage in sorted(set(before["results"]) | set(after["results"])):
+        if stage not in before["results"] or stage not in after["results"]:
+            print(f"{stage:>18} {'':>12} only in {'before' if stage in before['results'] else 'after'}")
+            continue
+        for metric in METRICS:
+            old, new = before["results"][stage][metric], after["results"][stage][metric]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"{stage:>18} {metric:>12} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%")
+            worse = -change if metric == "ops_per_sec" else change
+            if fail_above is not None and metric in ("ops_per_sec", "p99_ms") and worse > fail_above:
+                regressions.append((stage, metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the suite and write a results file")
+    run.add_argument("--out", default="bench_results.json")
+    run.add_argument("--size", type=int, default=500)
+    run.add_argument("--seed", type=int, default=7)
+    run.add_argument("--mix", default="common")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--entity-mode", default=None, help="override CALMORA_ENTITY_MODE")
+
+    cmp = sub.add_parser("compare", help="diff two results files")
+    cmp.add_argument("before")
+    cmp.add_argument("after")
+    cmp.add_argument("--fail-above", type=float, default=None,
+                     help="exit 1 if throughput or p99 regresses by more than this percent")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = run_suite(args)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {args.out}")
+    else:
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        regressions = compare(before, after, args.fail_above)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.fail_above}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# backend/conversation_state.py
+
+
+class ConversationState:
+    """
+    Running summary of one conversation, updated once per turn.
+
+    turns     - number of turns observed
+    sentiment - exponential moving average of the turn sentiments
+    scores    - intent -> decayed count of recent turns with that intent
+
+    Scores that decay below a small floor are dropped, so the state never
+    holds more than one entry per intent however long the conversation runs.
+    """
+
+    __slots__ = ("turns", "sentiment", "scores")
+
+    def __init__(self, turns=0, sentiment=0.0, scores=None):
+        self.turns = turns
+        self.sentiment = sentiment
+        self.scores = scores if scores is not None else {}
+
+    def top_intent(self):
+        """
+        Return (intent, score) for the strongest recent intent, or (None, 0.0).
+        """
+        if not self.scores:
+            return None, 0.0
+        return max(self.scores.items(), key=lambda x: x[1])
+
+    def copy(self):
+        return ConversationState(self.turns, self.sentiment, dict(self.scores))
+
+    def to_list(self):
+        """
+        Compact JSON-able form: [turns, sentiment, {intent: score}].
+        """
+        return [self.turns, round(self.sentiment, 4),
+                {intent: round(score, 4) for intent, score in self.scores.items()}]
+
+    @classmethod
+    def from_list(cls, data):
+        turns, sentiment, scores = data
+        return cls(turns, sentiment, dict(scores))
+
+    def __repr__(self):
+        return f"ConversationState(turns={self.turns}, sentiment={self.sentiment:.3f}, scores={self.scores})"
+
+
+class ConversationContext:
+    """
+    Folds each turn into a ConversationState and picks the intent and
+    sentiment a response should be selected with.
+
+    decay:           factor applied to every intent score per turn
+    sentiment_alpha: weight of the newest turn in the sentiment average
+    min_score:       decayed score a past intent needs to stand in for a vague turn
+    vague_intents:   intents that carry no topic and may be replaced from context
+    untracked:       intents never carried over to later turns
+    """
+
+    def __init__(self, decay=0.6, sentiment_alpha=0.6, min_score=0.5,
+                 vague_intents=("general",), untracked=("general", "suicide")):
+        self.decay = decay
+        self.sentiment_alpha = sentiment_alpha
+        self.min_score = min_score
+        self.vague_intents = frozenset(vague_intents)
+        self.untracked = frozenset(untracked)
+        self._floor = min(0.05, min_score / 10)
+
+    def observe(self, state, intent, sentiment):
+        """
+        Update state with one turn and return (intent, sentiment) to respond with.
+
+        A vague intent is replaced by the strongest recent intent when its score
+        reaches min_score; any other intent is kept as is. The sentiment is the
+        updated moving average; a turn without a score (None) leaves it unchanged.
+        """
+        scores = state.scores
+        for tracked in list(scores):
+            score = scores[tracked] * self.decay
+            if score < self._floor:
+                del scores[tracked]
+            else:
+                scores[tracked] = score
+
+        context_intent = intent
+        if intent in self.vague_intents:
+            top, score = state.top_intent()
+            if top is not None and score >= self.min_score:
+                context_intent = top
+
+        if intent not in self.untracked:
+            scores[intent] = scores.get(intent, 0.0) + 1.0
+
+        if sentiment is not None:
+            if state.turns == 0:
+                state.sentiment = sentiment
+            else:
+                state.sentiment += self.sentiment_alpha * (sentiment - state.sentiment)
+        state.turns += 1
+        return context_intent, state.sentiment
@@ -0,0 +1,233 @@
+# backend/conversation_store.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from conversation_state import ConversationState
+
+
+class _Conversation:
+    __slots__ = ("history", "state")
+
+    def __init__(self, max_entries):
+        self.history = deque(maxlen=max_entries)
+        self.state = None
+
+
+class InMemoryConversationStore:
+    """
+    Per-process conversation history. Each conversation is a bounded ring
+    buffer plus its ConversationState; when more than max_conversations are
+    held, the least recently used one is evicted. get_state hands out a copy,
+    so a turn only changes the stored state once append() commits it.
+    """
+
+    def __init__(self, max_entries=6, max_conversations=10000):
+        self.max_entries = max_entries
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return []
+            self._conversations.move_to_end(conversation_id)
+            return list(conversation.history)
+
+    def get_state(self, conversation_id):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or conversation.state is None:
+                return ConversationState()
+            return conversation.state.copy()
+
+    def append(self, conversation_id, *entries, state=None):
+        """
+        Add entries to a conversation and, if given, store its updated state.
+        """
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = _Conversation(self.max_entries)
+                if len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(conversation_id)
+            conversation.history.extend(entries)
+            if state is not None:
+                conversation.state = state
+
+    def clear(self, conversation_id):
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+
+    def after_fork(self):
+        pass
+
+    def __len__(self):
+        return len(self._conversations)
+
+
+class SQLiteConversationStore:
+    """
+    Conversation history in a SQLite file, so every worker on the node sees
+    the same conversations. Only the newest max_entries rows are kept per
+    conversation, and its ConversationState is kept as one compact row.
+
+    Each conversation's last_seen time is updated on append. At most every
+    prune_interval seconds, conversations idle for more than max_age seconds
+    are deleted, then the least recently seen beyond max_conversations.
+    """
+
+    def __init__(self, path, max_entries=6, max_conversations=10000, max_age=3 * 3600, prune_interval=60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_conversations = max_conversations
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_entry ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " conversation_id TEXT NOT NULL,"
+                " entry TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_conversation_entry_conversation"
+                " ON conversation_entry (conversation_id, id)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_state ("
+                " conversation_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation ("
+                " conversation_id TEXT PRIMARY KEY,"
+                " last_seen REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_conversation_last_seen ON conversation (last_seen)")
+            # Conversations stored before last_seen existed start ageing now
+            now = time.time()
+            conn.execute(
+                "INSERT OR IGNORE INTO conversation (conversation_id, last_seen)"
+                " SELECT DISTINCT conversation_id, ? FROM conversation_entry",
+                (now,),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO conversation (conversation_id, last_seen)"
+                " SELECT conversation_id, ? FROM conversation_state",
+                (now,),
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self):
+        """
+        Forget connections inherited from a parent process.
+        """
+        self._local = threading.local()
+
+    def get(self, conversation_id):
+        rows = self._connect().execute(
+            "SELECT entry FROM conversation_entry WHERE conversation_id = ? ORDER BY id",
+            (conversation_id,),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_state(self, conversation_id):
+        row = self._connect().execute(
+            "SELECT state FROM conversation_state WHERE conversation_id = ?",
+            (conversation_id,),
+        ).fetchone()
+        if row is None:
+            return ConversationState()
+        return ConversationState.from_list(json.loads(row[0]))
+
+    def append(self, conversation_id, *entries, state=None):
+        """
+        Add entries to a conversation and, if given, store its updated state,
+        in one transaction.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO conversation (conversation_id, last_seen) VALUES (?, ?)",
+                (conversation_id, now),
+            )
+            conn.executemany(
+                "INSERT INTO conversation_entry (conversation_id, entry) VALUES (?, ?)",
+                [(conversation_id, json.dumps(entry)) for entry in entries],
+            )
+            conn.execute(
+                "DELETE FROM conversation_entry WHERE conversation_id = ? AND id NOT IN ("
+                " SELECT id FROM conversation_entry WHERE conversation_id = ?"
+                " ORDER BY id DESC LIMIT ?)",
+                (conversation_id, conversation_id, self.max_entries),
+            )
+            if state is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO conversation_state (conversation_id, state) VALUES (?, ?)",
+                    (conversation_id, json.dumps(state.to_list(), separators=(",", ":"))),
+                )
+        if now >= self._next_prune:
+            self._next_prune = now + self.prune_interval
+            self.prune(now)
+
+    def prune(self, now=None):
+        """
+        Delete conversations idle for more than max_age seconds, then the
+        least recently seen ones beyond max_conversations. Returns how many
+        conversations were deleted.
+        """
+        cutoff = (now if now is not None else time.time()) - self.max_age
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS pruned_conversation (conversation_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM pruned_conversation")
+            conn.execute(
+                "INSERT INTO pruned_conversation SELECT conversation_id FROM conversation WHERE last_seen < ?",
+                (cutoff,),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO pruned_conversation SELECT conversation_id FROM conversation"
+                " ORDER BY last_seen DESC LIMIT -1 OFFSET ?",
+                (self.max_conversations,),
+            )
+            for table in ("conversation_entry", "conversation_state", "conversation"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE conversation_id IN (SELECT conversation_id FROM pruned_conversation)"
+                )
+            return conn.execute("SELECT COUNT(*) FROM pruned_conversation").fetchone()[0]
+
+    def clear(self, conversation_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM conversation_entry WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversation_state WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversation WHERE conversation_id = ?", (conversation_id,))
+
+
+def create_conversation_store(backend="memory", path=None, max_entries=6, max_conversations=10000,
+                              max_age=3 * 3600):
+    """
+    Build the configured conversation store ("memory" or "sqlite").
+    """
+    if backend == "memory":
+        return InMemoryConversationStore(max_entries=max_entries, max_conversations=max_conversations)
+    if backend == "sqlite":
+        return SQLiteConversationStore(path, max_entries=max_entries, max_conversations=max_conversations,
+                                       max_age=max_age)
+    raise ValueError(f"Unknown conversation store {backend!r}, expected 'memory' or 'sqlite'")
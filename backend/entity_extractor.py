@@ -0,0 +1,74 @@
+# backend/entity_extractor.py
+
+import threading
+
+ENTITY_MODES = ("full", "ner-only", "off")
+
+# Components that named entity recognition never reads from
+NON_NER_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+
+class EntityExtractor:
+    """
+    spaCy-backed entity extraction that loads its model on first use.
+
+    Modes:
+      "full"     - the complete pipeline, as shipped by the model package
+      "ner-only" - only the components the entity recognizer depends on
+      "off"      - spaCy is never imported and no entities are returned
+    """
+
+    def __init__(self, mode="ner-only", model_name="en_core_web_sm"):
+        if mode not in ENTITY_MODES:
+            raise ValueError(f"Unknown entity mode {mode!r}, expected one of {ENTITY_MODES}")
+        self.mode = mode
+        self.model_name = model_name
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._nlp is not None
+
+    @property
+    def nlp(self):
+        """
+        The spaCy pipeline, loaded once on first access (None when mode is "off").
+        """
+        if self._nlp is None and self.mode != "off":
+            with self._lock:
+                if self._nlp is None:
+                    self._nlp = self._load()
+        return self._nlp
+
+    def _load(self):
+        import spacy
+
+        if self.mode == "full":
+            return spacy.load(self.model_name)
+
+        nlp = spacy.load(self.model_name, exclude=NON_NER_COMPONENTS)
+        # A shared tok2vec is only worth keeping if the recognizer listens to it
+        if "tok2vec" in nlp.pipe_names and "ner" not in nlp.get_pipe("tok2vec").listening_components:
+            nlp.remove_pipe("tok2vec")
+        return nlp
+
+    def extract(self, text):
+        """
+        Return {entity label: entity text} for a single message.
+        """
+        if self.mode == "off":
+            return {}
+        return self.to_dict(self.nlp(text))
+
+    def extract_batch(self, texts, batch_size=64):
+        """
+        Return one entity dict per text, streaming them through nlp.pipe.
+        """
+        if self.mode == "off":
+            return [{} for _ in texts]
+        return [self.to_dict(doc) for doc in self.nlp.pipe(texts, batch_size=batch_size)]
+
+    @staticmethod
+    def to_dict(doc):
+        return {ent.label_: ent.text for ent in doc.ents}
@@ -0,0 +1,49 @@
+# backend/gunicorn.conf.py
+#
+# Production server settings. As in serve.py, the app and models are loaded
+# once in the master (preload_app) and the forked workers share them
+# copy-on-write; gunicorn adds worker supervision, timeouts and graceful
+# reloads on top.
+#
+#   cd backend && gunicorn -c gunicorn.conf.py app:app
+
+import gc
+import os
+import sys
+
+# Threads don't survive a fork, so the master warms up on its own thread
+os.environ.setdefault("CALMORA_WARMUP", "blocking")
+
+bind = os.environ.get("CALMORA_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("CALMORA_WORKERS", os.cpu_count() or 1))
+worker_class = "gthread"
+threads = int(os.environ.get("CALMORA_THREADS", 4))
+preload_app = True
+
+
+def when_ready(server):
+    """
+    The app has been imported and warmed up in the master: give up its
+    database connections and freeze the heap before any worker is forked.
+    """
+    import app as app_module
+
+    if app_module.warmup.state == "failed":
+        server.log.error("start-up failed: %s", app_module.warmup.error)
+        sys.exit(1)
+    app_module.release_connections()
+    # Keep the collector from touching (and un-sharing) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app as app_module
+
+    app_module.init_worker()
+
+
+def worker_exit(server, worker):
+    import app as app_module
+
+    app_module.shutdown_worker()
@@ -0,0 +1,84 @@
+# backend/history_export.py
+
+import base64
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_FIELDS = ("created_at", "conversation_id", "message", "intent", "sentiment", "response_id", "cursor")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, message_id):
+    """
+    Opaque resume token for the keyset position (created_at, id) of a row.
+    """
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def export_record(row):
+    """
+    One stored turn as exported; row has the Message columns.
+    """
+    return {
+        "created_at": row.created_at.isoformat(),
+        "conversation_id": row.conversation_id,
+        "message": row.content,
+        "intent": row.intent,
+        "sentiment": row.sentiment,
+        "response_id": row.response_id,
+        "cursor": encode_cursor(row.created_at, row.id),
+    }
+
+
+def format_pages(pages, fmt):
+    """
+    Turn an iterable of row pages into text chunks, one chunk per page.
+    """
+    if fmt == "ndjson":
+        for page in pages:
+            yield "".join(json.dumps(export_record(row), ensure_ascii=False) + "\n" for row in page)
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for page in pages:
+        for row in page:
+            writer.writerow(export_record(row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    """
+    Gzip a stream of text chunks on the fly, flushing after each chunk so
+    the client receives data as it is produced.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
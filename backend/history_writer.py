@@ -0,0 +1,148 @@
+# backend/history_writer.py
+
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryBackpressure(Exception):
+    """
+    Raised when the write-behind queue stayed full for longer than put() may wait.
+    """
+
+
+class WriteBehindQueue:
+    """
+    Buffers rows in memory and writes them from a background thread in batches.
+
+    write_batch(rows) is called with up to batch_size rows at a time, as soon
+    as batch_size rows are waiting or flush_interval seconds after the first
+    row of a batch arrived, whichever comes first. At most max_queue rows are
+    buffered; put() then blocks for up to put_timeout seconds and raises
+    HistoryBackpressure if no room frees up, so a slow disk pushes back on
+    callers instead of growing memory without bound.
+
+    put(row, drop_when_full=True) never waits: a row that finds the queue
+    full is counted in stats["dropped"] and discarded, for callers whose
+    answer must not depend on the history being kept.
+
+    The writer thread starts on first use in each process, so a queue created
+    before a fork works in every worker. close() flushes what is buffered.
+    A batch that fails to write is logged and retried one row at a time, so
+    a bad row only costs itself; rows that still fail are counted in
+    stats["failed"] and dropped.
+    """
+
+    _STOP = object()
+
+    def __init__(self, write_batch, batch_size=100, flush_interval=0.5, max_queue=10000, put_timeout=0.5):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "failed": 0,
+                      "rejected": 0, "dropped": 0, "write_seconds": 0.0}
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                # After a fork the parent's queue contents and thread are not ours
+                if self._pid is not None and self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, row, drop_when_full=False):
+        """
+        Queue a row; returns False if it was dropped because the queue was full.
+        """
+        self._ensure_started()
+        try:
+            if drop_when_full:
+                self._queue.put_nowait(row)
+            else:
+                self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["dropped" if drop_when_full else "rejected"] += 1
+            if drop_when_full:
+                return False
+            raise HistoryBackpressure() from None
+        with self._stats_lock:
+            self.stats["queued"] += 1
+        return True
+
+    def _write(self, rows):
+        start = time.perf_counter()
+        try:
+            self.write_batch(rows)
+        except Exception:
+            logger.exception("history batch of %d rows failed, retrying row by row", len(rows))
+            written = failed = 0
+            for row in rows:
+                try:
+                    self.write_batch([row])
+                    written += 1
+                except Exception:
+                    logger.exception("dropping history row that failed to write")
+                    failed += 1
+        else:
+            written, failed = len(rows), 0
+        with self._stats_lock:
+            self.stats["written"] += written
+            self.stats["failed"] += failed
+            if written:
+                self.stats["batches"] += 1
+            self.stats["write_seconds"] += time.perf_counter() - start
+
+    def _run(self):
+        work = self._queue
+        while True:
+            row = work.get()
+            if row is self._STOP:
+                return
+            rows = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = work.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is self._STOP:
+                    stopping = True
+                    break
+                rows.append(row)
+            self._write(rows)
+            if stopping:
+                return
+
+    def close(self, timeout=5.0):
+        """
+        Flush buffered rows and stop the writer thread.
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,345 @@
+# backend/intent_matrix.py
+
+import re
+
+import numpy as np
+from scipy import sparse
+
+# Joins a batch into one string; a non-word, non-space character that no
+# keyword contains, so it ends every n-gram and keeps word boundaries at
+# message edges
+_SEPARATOR = "\x00"
+
+_MASK = (1 << 64) - 1
+_FINGERPRINT_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Character classes, as the re module's \\w and \\s define them
+_PUNCTUATION, _WORD, _SPACE_CHAR = 0, 1, 2
+
+# Gap codes between consecutive tokens: touching, one space, anything else
+_ADJACENT, _SPACE, _OTHER_GAP = 0, 1, 2
+
+
+def _char_class(ch):
+    if re.match(r"\w", ch):
+        return _WORD
+    return _SPACE_CHAR if re.match(r"\s", ch) else _PUNCTUATION
+
+
+_ASCII_CLASSES = np.array([_char_class(chr(code)) for code in range(128)], dtype=np.uint8)
+
+
+def _code_points(text):
+    """
+    The text as an array of code points with their classes: bytes when it is
+    ASCII (the usual case, and a quarter of the memory traffic), UTF-32
+    otherwise, with non-ASCII classes looked up once per distinct character.
+    """
+    if text.isascii():
+        codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        return codes, _ASCII_CLASSES[codes]
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    classes = _ASCII_CLASSES[np.minimum(codes, 127)]
+    other = np.flatnonzero(codes >= 128)
+    unique, inverse = np.unique(codes[other], return_inverse=True)
+    classes[other] = np.array([_char_class(chr(code)) for code in unique.tolist()], dtype=np.uint8)[inverse]
+    return codes, classes
+
+
+class _Tokens:
+    """
+    A string split into word runs and single punctuation characters, with
+    each token's span and the gap code before it.
+    """
+
+    def __init__(self, text):
+        self.codes, classes = _code_points(text)
+        is_word = classes == _WORD
+        punctuation = classes == _PUNCTUATION
+        before = np.zeros_like(is_word)
+        before[1:] = is_word[:-1]
+        after = np.zeros_like(is_word)
+        after[:-1] = is_word[1:]
+        self.starts = np.flatnonzero((is_word & ~before) | punctuation)
+        self.ends = np.flatnonzero((is_word & ~after) | punctuation) + 1
+        self.is_word = np.concatenate((is_word, [False]))
+
+        gaps = self.starts[1:] - self.ends[:-1]
+        self.gaps = np.full(len(self.starts), _OTHER_GAP, dtype=np.uint64)
+        self.gaps[1:][gaps == 0] = _ADJACENT
+        single = np.flatnonzero(gaps == 1)
+        self.gaps[1:][single[self.codes[self.ends[:-1][single]] == ord(" ")]] = _SPACE
+
+    def fingerprints(self, depth):
+        """
+        Per-token uint64 mix of the length and the first and last depth
+        characters (repeating the edge character of shorter tokens). Equal
+        tokens get equal fingerprints; unequal ones that collide only add
+        candidates, which are checked against the text.
+        """
+        last = self.ends - 1
+        fingerprint = (self.ends - self.starts).astype(np.uint64)
+        multiplier = np.uint64(_FINGERPRINT_MULTIPLIER)
+        for i in range(depth):
+            for index in (np.minimum(self.starts + i, last), np.maximum(last - i, self.starts)):
+                fingerprint = fingerprint * multiplier + self.codes[index]
+        return fingerprint
+
+
+class _KeyTable:
+    """
+    uint64 key -> int lookup for a whole array of queries at once: a
+    power-of-two table indexed by multiplicative hashing, grown until every
+    key has a slot of its own, so a lookup is two gathers and a compare.
+    """
+
+    def __init__(self, keys, values):
+        keys = np.asarray(keys, dtype=np.uint64)
+        bits = max(len(keys).bit_length() + 1, 4)
+        while True:
+            slots = self._slots(keys, bits)
+            if len(np.unique(slots)) == len(keys):
+                break
+            bits += 1
+        self._shift = np.uint64(64 - bits)
+        self._keys = np.zeros(1 << bits, dtype=np.uint64)
+        self._values = np.zeros(1 << bits, dtype=np.int64)
+        self._filled = np.zeros(1 << bits, dtype=bool)
+        self._keys[slots] = keys
+        self._values[slots] = values
+        self._filled[slots] = True
+
+    @staticmethod
+    def _slots(keys, bits):
+        return ((keys * np.uint64(_FINGERPRINT_MULTIPLIER)) >> np.uint64(64 - bits)).astype(np.int64)
+
+    def lookup(self, keys, missing=0):
+        slots = ((keys * np.uint64(_FINGERPRINT_MULTIPLIER)) >> self._shift).astype(np.int64)
+        found = self._filled[slots] & (self._keys[slots] == keys)
+        return np.where(found, self._values[slots], missing)
+
+
+def _ragged(offsets, lengths):
+    """
+    Flat indices covering offsets[i]:offsets[i] + lengths[i] for every i,
+    and where each run starts in the result.
+    """
+    run_starts = np.cumsum(lengths) - lengths
+    within = np.arange(int(lengths.sum())) - np.repeat(run_starts, lengths)
+    return np.repeat(offsets, lengths) + within, run_starts
+
+
+def _fingerprint(token, depth):
+    fingerprint = len(token)
+    for i in range(depth):
+        for ch in (token[min(i, len(token) - 1)], token[max(len(token) - 1 - i, 0)]):
+            fingerprint = (fingerprint * _FINGERPRINT_MULTIPLIER + ord(ch)) & _MASK
+    return fingerprint
+
+
+class SparseIntentScorer:
+    """
+    Intent scoring as one sparse matrix product.
+
+    The keyword map is compiled into a keyword-by-intent matrix W, where
+    W[k, i] is how many times keyword k is listed under intent i. A batch of
+    messages is featurized into a sparse binary matrix X of the keyword
+    n-grams each contains, and X @ W gives every intent score at once.
+
+    Featurizing is array work over the whole batch rather than a regex scan:
+    the text is split into word and punctuation tokens from its code points,
+    tokens are mapped to the keyword token vocabulary by a fingerprint of a
+    few of their characters, and each n-gram of token ids and the gaps
+    between them is packed into one integer and looked up among the
+    keywords' codes. The hits are then checked against the text itself,
+    including the \\b boundaries, so the scores equal
+    KeywordMatcher.intent_counts. Classification applies the
+    same rules: priority intent first (substring match), then the highest
+    count, ties to the intent listed first. All methods take lowercased
+    messages.
+    """
+
+    def __init__(self, keyword_map, priority_intent=None, default="general"):
+        self.intents = list(keyword_map)
+        self.priority_intent = priority_intent
+        self.default = default
+        self.priority_keywords = list(dict.fromkeys(keyword_map[priority_intent])) if priority_intent else []
+
+        self.vocabulary = {}
+        rows, cols = [], []
+        for col, (intent, keywords) in enumerate(keyword_map.items()):
+            for keyword in keywords:
+                rows.append(self.vocabulary.setdefault(keyword, len(self.vocabulary)))
+                cols.append(col)
+        # Duplicate (row, col) entries are summed, so repeated keywords count twice
+        self.weights = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(self.vocabulary), len(self.intents)),
+        )
+        self.keywords = list(self.vocabulary)
+        self._compile_ngrams()
+
+    def _compile_ngrams(self):
+        # Token ids start at 1; 0 is every token that isn't in a keyword
+        token_ids = {}
+        keyword_tokens = []
+        for keyword in self.keywords:
+            tokens = _Tokens(keyword)
+            ids = []
+            for start, end in zip(tokens.starts.tolist(), tokens.ends.tolist()):
+                ids.append(token_ids.setdefault(keyword[start:end], len(token_ids) + 1))
+            keyword_tokens.append((ids, tokens.gaps.tolist()))
+
+        # Sample as few characters per token as keep the keyword tokens apart
+        self._depth = 1
+        while True:
+            fingerprints = np.array([_fingerprint(token, self._depth) for token in token_ids], dtype=np.uint64)
+            if len(np.unique(fingerprints)) == len(fingerprints):
+                break
+            self._depth += 1
+        self._token_ids = _KeyTable(fingerprints, list(token_ids.values()))
+
+        # An n-gram code packs each token id with the gap code before it.
+        # Keywords differing only in unusual whitespace, or whose long
+        # n-grams wrap around 2**64, share a code; a code stands for a group
+        # of keywords and the check against the text tells them apart
+        self._radix = np.uint64(len(token_ids) + 1)
+        groups = {}
+        for column, (ids, gaps) in enumerate(keyword_tokens):
+            code = 0
+            for i, (token_id, gap) in enumerate(zip(ids, gaps)):
+                code = ((code * 3 + (gap if i else 0)) * int(self._radix) + token_id) & _MASK
+            groups.setdefault(len(ids), {}).setdefault(code, []).append(column)
+        self._ngrams = {}
+        group_columns = []
+        for n, codes in groups.items():
+            self._ngrams[n] = _KeyTable(list(codes), range(len(group_columns), len(group_columns) + len(codes)))
+            group_columns.extend(codes.values())
+        self._group_sizes = np.array([len(columns) for columns in group_columns], dtype=np.int64)
+        self._group_offsets = np.cumsum(self._group_sizes) - self._group_sizes
+        self._group_columns = np.array([column for columns in group_columns for column in columns], dtype=np.int64)
+
+        # Keyword characters, concatenated, for checking hits against the text
+        self._keyword_lengths = np.array([len(keyword) for keyword in self.keywords], dtype=np.int64)
+        self._keyword_offsets = np.cumsum(self._keyword_lengths) - self._keyword_lengths
+        self._keyword_codes = np.array([ord(ch) for keyword in self.keywords for ch in keyword], dtype=np.uint32)
+
+    def _join(self, lower_msgs):
+        """
+        Return the batch as one string and the start offset of each message.
+        """
+        lengths = np.fromiter(map(len, lower_msgs), dtype=np.int64, count=len(lower_msgs)) + 1
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        return _SEPARATOR.join(lower_msgs), starts
+
+    def _matches(self, text):
+        """
+        Return (char positions, keyword columns) of every keyword occurrence.
+        """
+        tokens = _Tokens(text)
+        ids = self._token_ids.lookup(tokens.fingerprints(self._depth))
+
+        # Only n-grams starting at a keyword token can match; grow their
+        # codes one token at a time
+        candidates = np.flatnonzero(ids)
+        code = ids[candidates].astype(np.uint64)
+        positions, columns, lengths = ([np.zeros(0, dtype=np.int64)] for _ in range(3))
+        for n in range(1, max(self._ngrams, default=0) + 1):
+            if n > 1:
+                following = candidates + n - 1
+                keep = following < len(ids)
+                keep[keep] = ids[following[keep]] != 0
+                candidates, code, following = candidates[keep], code[keep], following[keep]
+                code = (code * np.uint64(3) + tokens.gaps[following].astype(np.uint64)) * self._radix \
+                    + ids[following].astype(np.uint64)
+            if n not in self._ngrams:
+                continue
+            keyword_groups = self._ngrams[n].lookup(code, missing=-1)
+            hit = keyword_groups >= 0
+            keyword_groups = keyword_groups[hit]
+            sizes = self._group_sizes[keyword_groups]
+            index, _ = _ragged(self._group_offsets[keyword_groups], sizes)
+            positions.append(np.repeat(candidates[hit], sizes))
+            columns.append(self._group_columns[index])
+            lengths.append(np.full(len(index), n - 1))
+        first = np.concatenate(positions)
+        starts = tokens.starts[first]
+        ends = tokens.ends[first + np.concatenate(lengths)]
+        columns = np.concatenate(columns)
+
+        # Exact check: \b at both ends, same length, same characters
+        is_word = tokens.is_word
+        ok = np.where(starts > 0, is_word[starts - 1], False) != is_word[starts]
+        ok &= is_word[ends] != is_word[ends - 1]
+        ok &= ends - starts == self._keyword_lengths[columns]
+        starts, columns = starts[ok], columns[ok]
+        lengths = self._keyword_lengths[columns]
+        if len(lengths):
+            text_index, hit_offsets = _ragged(starts, lengths)
+            keyword_index, _ = _ragged(self._keyword_offsets[columns], lengths)
+            same = tokens.codes[text_index] == self._keyword_codes[keyword_index]
+            ok = np.logical_and.reduceat(same, hit_offsets)
+            starts, columns = starts[ok], columns[ok]
+        return starts, columns
+
+    def featurize(self, lower_msgs):
+        """
+        Sparse binary (messages x keywords) presence matrix.
+        """
+        text, starts = self._join(lower_msgs)
+        positions, columns = self._matches(text)
+        rows = np.searchsorted(starts, positions, side="right") - 1
+        features = sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.float32), (rows, columns)),
+            shape=(len(lower_msgs), len(self.vocabulary)),
+        )
+        # A keyword seen more than once in a message still counts once
+        features.data[:] = 1
+        return features
+
+    def _priority_rows(self, text, starts):
+        """
+        Rows whose message contains a priority keyword anywhere (substring).
+        """
+        positions = []
+        for keyword in self.priority_keywords:
+            position = text.find(keyword)
+            while position != -1:
+                positions.append(position)
+                # One hit per message is enough; go on from the next message
+                position = text.find(_SEPARATOR, position)
+                if position == -1:
+                    break
+                position = text.find(keyword, position)
+        return np.searchsorted(starts, np.array(positions, dtype=np.int64), side="right") - 1
+
+    def scores(self, lower_msgs):
+        """
+        Dense (messages x intents) array of keyword counts, in intent order.
+        The priority rule is not applied to the scores.
+        """
+        return (self.featurize(lower_msgs) @ self.weights).toarray()
+
+    def classify_batch(self, lower_msgs):
+        lower_msgs = list(lower_msgs)
+        if not lower_msgs:
+            return []
+        scores = self.scores(lower_msgs)
+        best = scores.argmax(axis=1)
+        matched = scores[np.arange(len(lower_msgs)), best] > 0
+        results = np.where(matched, np.asarray(self.intents, dtype=object)[best], self.default)
+        if self.priority_keywords:
+            text, starts = self._join(lower_msgs)
+            results[self._priority_rows(text, starts)] = self.priority_intent
+        return results.tolist()
+
+    def classify(self, lower_msg):
+        return self.classify_batch([lower_msg])[0]
+
+    def top_k(self, lower_msg, k=3):
+        """
+        The k highest scoring intents with a match, as [(intent, score)].
+        """
+        row = self.scores([lower_msg])[0]
+        order = np.argsort(-row, kind="stable")[:k]
+        return [(self.intents[i], int(row[i])) for i in order if row[i] > 0]
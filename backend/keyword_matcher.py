@@ -0,0 +1,119 @@
+# backend/keyword_matcher.py
+
+import re
+
+
+def _is_word_char(ch):
+    return re.match(r"\w", ch) is not None
+
+
+def _trie_pattern(node):
+    """
+    Render a character trie as a regex fragment. Children are tried before the
+    terminal (empty) branch, so the longest keyword at a position wins and the
+    engine backtracks to shorter ones only when the trailing boundary fails.
+    """
+    branches = [re.escape(ch) + _trie_pattern(child)
+                for ch, child in sorted(node.items()) if ch != ""]
+    if "" in node:
+        if not branches:
+            return ""
+        branches.append("")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class KeywordMatcher:
+    """
+    Compiled keyword matcher built once from an intent -> keywords mapping.
+
+    All keywords are folded into a single trie-shaped word-boundary pattern so a
+    message is scanned once, instead of once per keyword. The per-intent counts
+    are identical to running re.search(r'\\b' + keyword + r'\\b') for each
+    keyword entry, including duplicate entries and keywords that overlap.
+    """
+
+    def __init__(self, keyword_map, priority_intent=None):
+        self.intents = list(keyword_map)
+        self.priority_intent = priority_intent
+
+        # keyword -> intents it counts towards (duplicates count twice, as before)
+        self._keyword_intents = {}
+        for intent, keywords in keyword_map.items():
+            for keyword in keywords:
+                self._keyword_intents.setdefault(keyword, []).append(intent)
+
+        trie = {}
+        for keyword in self._keyword_intents:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        self._pattern = re.compile(r"\b(?=(" + _trie_pattern(trie) + r")\b)")
+
+        # Only the longest keyword is reported per start position, so remember
+        # the shorter keywords that are guaranteed to match along with it.
+        self._implied = {}
+        for keyword in self._keyword_intents:
+            self._implied[keyword] = [
+                other for other in self._keyword_intents
+                if len(other) < len(keyword) and keyword.startswith(other)
+                and _is_word_char(other[-1]) != _is_word_char(keyword[len(other)])
+            ]
+
+        # The priority intent keeps its plain substring semantics
+        self._priority_pattern = None
+        if priority_intent is not None:
+            self._priority_pattern = re.compile(
+                "|".join(re.escape(k) for k in keyword_map[priority_intent]))
+
+    def find(self, lower_msg):
+        """
+        Return the set of keywords present in an already lowercased message.
+        """
+        hits = set()
+        for match in self._pattern.finditer(lower_msg):
+            keyword = match.group(1)
+            if keyword not in hits:
+                hits.add(keyword)
+                hits.update(self._implied[keyword])
+        return hits
+
+    def intent_counts(self, lower_msg):
+        """
+        Return {intent: matched keyword count} in keyword map order, omitting
+        intents with no matches.
+        """
+        return self.counts_from_hits(self.find(lower_msg))
+
+    def counts_from_hits(self, hits):
+        """
+        intent_counts() for a keyword set already returned by find().
+        """
+        counts = {}
+        for keyword in hits:
+            for intent in self._keyword_intents[keyword]:
+                counts[intent] = counts.get(intent, 0) + 1
+        return {intent: counts[intent] for intent in self.intents if intent in counts}
+
+    def has_priority(self, lower_msg):
+        return self._priority_pattern is not None and self._priority_pattern.search(lower_msg) is not None
+
+    def classify(self, lower_msg, default="general"):
+        """
+        Priority intent first (substring match), then the intent with the most
+        keyword matches; ties go to the intent listed first.
+        """
+        return self.classify_hits(lower_msg, None, default)
+
+    def classify_hits(self, lower_msg, hits, default="general"):
+        """
+        classify() reusing keyword hits from an earlier find() when given.
+        """
+        if self.has_priority(lower_msg):
+            return self.priority_intent
+        matches = self.counts_from_hits(self.find(lower_msg) if hits is None else hits)
+        if matches:
+            return max(matches.items(), key=lambda x: x[1])[0]
+        return default
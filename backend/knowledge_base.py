@@ -0,0 +1,175 @@
+# backend/knowledge_base.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class KnowledgeSnapshot:
+    """
+    One immutable, fully compiled version of the knowledge base.
+
+    version  - short id derived from the content of every section, so
+               workers that loaded the same files report the same version
+    digests  - section -> sha256 of its file
+    compiled - section -> whatever that section's compile function returned
+    Index it by section name: snapshot["responses"].
+
+    Callers take one snapshot (KnowledgeBase.current) and use it for the whole
+    request, so a reload never mixes two versions inside one answer.
+    """
+
+    __slots__ = ("version", "digests", "compiled", "loaded_at")
+
+    def __init__(self, digests, compiled, loaded_at):
+        self.digests = dict(digests)
+        self.compiled = dict(compiled)
+        self.loaded_at = loaded_at
+        combined = hashlib.sha256()
+        for name in sorted(self.digests):
+            combined.update(f"{name}:{self.digests[name]}\n".encode())
+        self.version = combined.hexdigest()[:12]
+
+    def __getitem__(self, section):
+        return self.compiled[section]
+
+    def __repr__(self):
+        return f"KnowledgeSnapshot({self.version}, sections={sorted(self.compiled)})"
+
+
+class _Section:
+    __slots__ = ("filename", "compile", "stat")
+
+    def __init__(self, filename, compile):
+        self.filename = filename
+        self.compile = compile
+        self.stat = None
+
+
+class KnowledgeBase:
+    """
+    Keywords and response templates loaded from JSON files in a directory,
+    compiled into a KnowledgeSnapshot and swapped atomically when they change.
+
+    Each section is one file with its own compile function (data -> compiled
+    object). reload() stats the files and recompiles only sections whose
+    content changed; the other sections' compiled objects are carried over
+    into the new snapshot. Publishing it is a single reference assignment, so
+    requests still holding the old snapshot finish on it undisturbed.
+
+    A file that fails to parse or compile leaves the current snapshot in
+    place; the failure is counted in stats["errors"] and kept in last_error.
+    With reload_interval > 0 a background thread calls reload() that often.
+    It starts on first use in each process, so a knowledge base created
+    before a fork is watched in every worker.
+    """
+
+    def __init__(self, directory, reload_interval=0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._sections = {}
+        self._snapshot = KnowledgeSnapshot({}, {}, time.time())
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # A fork taken mid-reload must not leave the child with a held lock
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+        self.last_error = None
+        self.stats = {"reloads": 0, "sections_compiled": 0, "errors": 0}
+
+    @property
+    def current(self):
+        if self.reload_interval > 0 and self._pid != os.getpid():
+            self._start_watching()
+        return self._snapshot
+
+    def add_section(self, name, filename, compile):
+        """
+        Register a section, load it and publish a snapshot that includes it.
+        Unlike reload(), a missing or invalid file raises here.
+        """
+        with self._reload_lock:
+            section = _Section(filename, compile)
+            digest, compiled = self._load(section)
+            self._sections[name] = section
+            old = self._snapshot
+            self._publish(dict(old.digests, **{name: digest}), dict(old.compiled, **{name: compiled}))
+        return self._snapshot
+
+    def _path(self, section):
+        return os.path.join(self.directory, section.filename)
+
+    def _read(self, section):
+        """
+        Return (stat key, raw bytes, sha256 hex digest) of a section's file.
+        """
+        with open(self._path(section), "rb") as f:
+            stat = os.fstat(f.fileno())
+            raw = f.read()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size), raw, hashlib.sha256(raw).hexdigest()
+
+    def _load(self, section):
+        section.stat, raw, digest = self._read(section)
+        compiled = section.compile(json.loads(raw))
+        self.stats["sections_compiled"] += 1
+        return digest, compiled
+
+    def _publish(self, digests, compiled):
+        self._snapshot = KnowledgeSnapshot(digests, compiled, time.time())
+
+    def reload(self):
+        """
+        Recompile the sections whose files changed and publish a new snapshot
+        if any did. Returns the current snapshot.
+        """
+        with self._reload_lock:
+            old = self._snapshot
+            digests, compiled = dict(old.digests), dict(old.compiled)
+            for name, section in self._sections.items():
+                try:
+                    stat = os.stat(self._path(section))
+                    stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    stat = None
+                if stat == section.stat:
+                    continue
+                # Whatever happens next, this version of the file is handled
+                # once; a broken file is retried when it changes again
+                section.stat = stat
+                try:
+                    stat, raw, digest = self._read(section)
+                    section.stat = stat
+                    # Touched but identical content: nothing to recompile
+                    if digest != old.digests[name]:
+                        compiled[name] = section.compile(json.loads(raw))
+                        digests[name] = digest
+                        self.stats["sections_compiled"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    self.last_error = f"{section.filename}: {e}"
+            if digests != old.digests:
+                self._publish(digests, compiled)
+                self.stats["reloads"] += 1
+            return self._snapshot
+
+    def _after_fork(self):
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def _start_watching(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A thread started before a fork doesn't exist in the child
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._watch, name="knowledge-watcher", daemon=True)
+            self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self.reload()
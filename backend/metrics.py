@@ -0,0 +1,207 @@
+# backend/metrics.py
+
+import bisect
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from response_table import SENTIMENT_BUCKETS, sentiment_bucket_index
+
+# Latency buckets in seconds, from 50us up to 10s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def process_rss_bytes():
+    """
+    Current resident set size, or the peak if /proc isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_memory_breakdown(pid="self"):
+    """
+    {"rss", "pss", "shared", "private"} in bytes from /proc/<pid>/smaps_rollup,
+    or None where it isn't available. "shared" is memory still shared with
+    other processes, e.g. copy-on-write pages inherited from a preforking master.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style registry. Counters and histograms are updated
+    inline; collectors are callables polled at scrape time that return
+    (name, type, help, value) or (name, type, help, [(labels dict, value), ...]).
+    With enabled=False, timers and observations are no-ops.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def observe(self, histogram, value, **labels):
+        if self.enabled:
+            histogram.observe(value, **labels)
+
+    def inc(self, counter, amount=1, **labels):
+        if self.enabled:
+            counter.inc(amount, **labels)
+
+    @contextmanager
+    def time(self, histogram, **labels):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if not isinstance(samples, list):
+                    samples = [({}, samples)]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(enabled=os.environ.get("CALMORA_METRICS", "1") != "0")
+
+STAGE_SECONDS = registry.histogram(
+    "calmora_stage_seconds", "Time spent in each stage of request handling.", ["stage"])
+REQUEST_SECONDS = registry.histogram(
+    "calmora_request_seconds", "End-to-end request latency by endpoint.", ["endpoint", "status"])
+CHAT_RESPONSES = registry.counter(
+    "calmora_chat_responses_total", "Chat responses by intent and sentiment bucket.", ["intent", "sentiment"])
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "calmora_chat_admission_wait_seconds", "Time admitted chat requests waited for a slot.")
+NLU_TIERS = registry.counter(
+    "calmora_nlu_tier_total", "Chat analyses by the NLU pipeline tier that ran.", ["tier"])
+
+
+def sentiment_bucket(sentiment):
+    """
+    The same thresholds select_response uses; "unscored" when sentiment was skipped.
+    """
+    if sentiment is None:
+        return "unscored"
+    return SENTIMENT_BUCKETS[sentiment_bucket_index(sentiment)]
+
+
+@registry.register_collector
+def _process_metrics():
+    samples = [("calmora_process_resident_memory_bytes", "gauge", "Resident memory of this process.",
+                process_rss_bytes())]
+    memory = process_memory_breakdown()
+    if memory is not None:
+        samples.append(("calmora_process_memory_bytes", "gauge",
+                        "Memory of this process by kind (shared pages are counted in full).",
+                        [({"kind": kind}, value) for kind, value in memory.items()]))
+    return samples
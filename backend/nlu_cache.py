@@ -0,0 +1,107 @@
+# backend/nlu_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_message(user_message):
+    """
+    Cache key for a message. Only runs of whitespace are collapsed: case and
+    punctuation change VADER and spaCy results, so they are kept.
+    """
+    return " ".join(user_message.split())
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache with a TTL for NLU analysis results.
+
+    Concurrent misses for the same key are coalesced: the first caller
+    computes the value and the others wait for it. Messages longer than
+    max_message_length bypass the cache entirely.
+    """
+
+    def __init__(self, max_size=4096, ttl=600, max_message_length=500):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_message_length = max_message_length
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0,
+                      "expirations": 0, "bypassed": 0}
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get_or_compute(self, key, compute, message_length=None):
+        """
+        Return the cached value for key, or compute(), store and return it.
+        message_length is the length of the message the key was built from,
+        checked against max_message_length; it defaults to len(key) for keys
+        that are the bare message.
+        """
+        if message_length is None:
+            message_length = len(key)
+        if not self.enabled or message_length > self.max_message_length:
+            self.stats["bypassed"] += 1
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self.stats["expirations"] += 1
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, flight.result)
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+            return flight.result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
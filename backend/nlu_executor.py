@@ -0,0 +1,78 @@
+# backend/nlu_executor.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class NLUExecutor:
+    """
+    Bounded thread pool for the NLU stages of /chat.
+
+    At most pool_size stages run at once and at most max_pending wait for a
+    worker; callers block while the queue is full, so NLU work can never claim
+    more than its share of the process. The request threads serving
+    /session-status, /login and /logout never enter the pool.
+    A pool_size of 0 disables offloading and runs stages inline.
+
+    The pool is started on first use in each process: a forked worker
+    inherits the parent's executor but none of its threads.
+    """
+
+    def __init__(self, pool_size=0, max_pending=None):
+        self.pool_size = pool_size
+        self.max_pending = max_pending if max_pending is not None else pool_size * 4
+        self._pool = None
+        self._slots = None
+        self._pid = None
+        self.in_flight = 0
+        self._count_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.pool_size > 0
+
+    def _ensure_started(self):
+        if self._pool is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pool is None or self._pid != os.getpid():
+                # After a fork the parent's threads, queue and slots are not ours
+                self._pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="nlu")
+                self._slots = threading.BoundedSemaphore(self.pool_size + self.max_pending)
+                self._count_lock = threading.Lock()
+                self.in_flight = 0
+                self._pid = os.getpid()
+
+    def submit(self, fn, *args):
+        self._ensure_started()
+        self._slots.acquire()
+        with self._count_lock:
+            self.in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._count_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def run_stages(self, stages):
+        """
+        Run independent stages concurrently.
+        stages maps a name to (fn, *args); returns {name: result}.
+        """
+        if not self.enabled:
+            return {name: fn(*args) for name, (fn, *args) in stages.items()}
+        futures = {name: self.submit(fn, *args) for name, (fn, *args) in stages.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=True)
@@ -0,0 +1,104 @@
+# backend/nlu_tiers.py
+
+import threading
+from contextlib import contextmanager
+
+# Cheapest first; each tier runs its own stage plus every stage before it
+TIERS = ("intent", "sentiment", "entities")
+TIER_STAGES = {tier: TIERS[:i + 1] for i, tier in enumerate(TIERS)}
+FULL_TIER = TIERS[-1]
+
+
+class StageCostModel:
+    """
+    Per-stage cost learned online from the running process.
+
+    Keeps an exponentially weighted mean and mean absolute deviation of the
+    CPU time each stage takes; the estimate is mean + deviations * deviation,
+    so a stage with noisy timings is budgeted conservatively. The first
+    sample of a stage is dropped as warm-up (it usually includes loading a
+    model). Stages with no estimate yet report None.
+    """
+
+    def __init__(self, alpha=0.1, deviations=2.0):
+        self.alpha = alpha
+        self.deviations = deviations
+        self._mean = {}
+        self._deviation = {}
+        self._warm = set()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self._warm:
+                self._warm.add(stage)
+                return
+            mean = self._mean.get(stage)
+            if mean is None:
+                self._mean[stage] = seconds
+                self._deviation[stage] = 0.0
+                return
+            self._deviation[stage] += self.alpha * (abs(seconds - mean) - self._deviation[stage])
+            self._mean[stage] = mean + self.alpha * (seconds - mean)
+
+    def estimate(self, stage):
+        mean = self._mean.get(stage)
+        if mean is None:
+            return None
+        return mean + self.deviations * self._deviation[stage]
+
+    def snapshot(self):
+        """
+        Return {stage: estimated seconds} for every stage with an estimate.
+        """
+        with self._lock:
+            return {stage: self.estimate(stage) for stage in self._mean}
+
+
+class TierPlanner:
+    """
+    Picks the richest tier whose estimated cost fits a latency budget.
+
+    The estimate for a tier is the sum of its stage costs, multiplied by the
+    number of analyses running in this process at the time, since they share
+    the interpreter; so tiers degrade as load rises. Stages without an
+    estimate are assumed to fit, so their cost gets measured. The cheapest
+    tier always runs, whatever the budget. With no budget (per request or
+    default_budget_ms) the full tier runs.
+    """
+
+    def __init__(self, cost_model, default_budget_ms=None):
+        self.cost_model = cost_model
+        self.default_budget_ms = default_budget_ms
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        """
+        Count an analysis as running; yields the load including it.
+        """
+        with self._lock:
+            self.in_flight += 1
+            load = self.in_flight
+        try:
+            yield load
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def choose(self, budget_ms=None, load=1):
+        if budget_ms is None:
+            budget_ms = self.default_budget_ms
+        if budget_ms is None:
+            return FULL_TIER
+        budget = budget_ms / 1000 / max(load, 1)
+        chosen = TIERS[0]
+        cost = 0.0
+        for tier in TIERS:
+            estimate = self.cost_model.estimate(tier)
+            cost += estimate or 0.0
+            if cost > budget and tier != TIERS[0]:
+                break
+            chosen = tier
+        return chosen
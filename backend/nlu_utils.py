@@ -1,105 +1,349 @@
 # backend/nlu_utils.py
 
-import spacy
-import re
+import os
+import time
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from keyword_matcher import KeywordMatcher
+from knowledge_base import KnowledgeBase
+from entity_extractor import EntityExtractor
+from nlu_cache import AnalysisCache
+from analyzed_message import AnalyzedMessage, as_analyzed
+from nlu_executor import NLUExecutor
+from metrics import registry, STAGE_SECONDS, NLU_TIERS
+from nlu_tiers import StageCostModel, TierPlanner, TIER_STAGES, FULL_TIER
+from nlu_worker import NLUClient
 
-# Load the spaCy English model
-nlp = spacy.load("en_core_web_sm")
-
-# Initialize VADER sentiment analyzer
-analyzer = SentimentIntensityAnalyzer()
-
-# Expanded keywords for mental health conditions
-INTENT_KEYWORDS = {
-    "loneliness": ["lonely", "alone", "isolated", "no friends", "isolation", "no one to talk to", "feel alone", 
-                   "solitude", "abandoned", "disconnected", "outcast", "excluded"],
-    "depression": ["depressed", "depression", "sad", "hopeless", "unmotivated", "numb", "empty", "unhappy", 
-                   "melancholy", "despair", "miserable", "worthless", "pointless", "can't enjoy", "no pleasure", 
-                   "don't care anymore", "no interest", "everything is hard"],
-    "anxiety": ["anxious", "anxiety", "worried", "panic", "nervous", "stressed", "overwhelmed", "fear", "dread", 
-                "on edge", "restless", "tense", "uneasy", "worried", "apprehensive", "can't relax", "constant worry"],
-    "stress": ["stress", "stressed", "overwhelmed", "burnout", "burned out", "can't cope", "pressure", "too much", 
-               "exhausted", "drained", "overloaded", "stretched thin"],
-    "ptsd": ["trauma", "traumatic", "flashback", "nightmare", "ptsd", "triggered", "abuse", "abused", "assault", 
-             "combat", "accident", "traumatized", "reliving", "hypervigilant"],
-    "grief": ["grief", "grieving", "loss", "lost", "died", "death", "passed away", "mourning", "bereavement", 
-              "missing someone", "deceased", "funeral"],
-    "addiction": ["addiction", "addicted", "substance", "alcohol", "drinking", "drugs", "gambling", "can't stop", 
-                  "dependency", "withdrawal", "relapse", "sober", "recovery", "using again"],
-    "relationship": ["relationship", "partner", "marriage", "spouse", "boyfriend", "girlfriend", "husband", "wife", 
-                     "dating", "fight", "arguing", "conflict", "trust issues", "jealous", "commitment", "communication problems"],
-    "breakup": ["breakup", "broke up", "divorce", "separated", "ex", "dumped", "left me", "ended relationship", 
-                "heartbreak", "getting over", "split up", "called it off"],
-    "insomnia": ["insomnia", "can't sleep", "sleep problems", "awake", "tossing and turning", "sleep deprived", 
-                  "exhausted", "fatigue", "tired", "sleepless", "not sleeping well", "waking up"],
-    "eating_disorder": ["eating disorder", "anorexia", "bulimia", "binge eating", "purging", "body image", "overweight", 
-                        "underweight", "diet", "starving", "calories", "food issues", "weight obsession", "hate my body"],
-    "self_harm": ["self harm", "cutting", "hurt myself", "harming myself", "injure myself", "self injury", 
-                   "burning myself", "self-destructive", "self-inflicted", "self-mutilation"],
-    "suicide": ["suicide", "suicidal", "kill myself", "end my life", "take my life", "want to die", 
-                 "better off dead", "no reason to live", "can't go on", "too painful to live", "ending it all"],
-    "substance_abuse": ["substance abuse", "drinking too much", "alcoholic", "drug problem", "high", "withdrawal", 
-                        "addiction", "pills", "overdose", "detox", "rehab", "intoxicated", "needle", "using"],
-    "bipolar": ["bipolar", "mania", "manic", "mood swings", "mood disorder", "highs and lows", "euphoria", 
-                "grandiose", "impulsive", "racing thoughts"],
-    "schizophrenia": ["schizophrenia", "psychosis", "hallucination", "delusion", "paranoia", "hearing voices", 
-                      "seeing things", "thought disorder", "disorganized thinking"],
-    "ocd": ["ocd", "obsessive", "compulsive", "intrusive thoughts", "rituals", "checking", "contamination", 
-            "symmetry", "orderliness", "perfectionism", "rumination", "can't stop thinking about"],
-    "burnout": ["burnout", "burned out", "exhausted", "overworked", "workaholic", "no energy", "chronic fatigue",
-                "compassion fatigue", "emotional exhaustion", "overextended", "job stress"],
-    "panic": ["panic attack", "heart racing", "can't breathe", "hyperventilating", "chest pain", "dying", 
-              "emergency", "losing control", "sudden fear", "shortness of breath"],
-    "trauma": ["trauma", "traumatic event", "abuse", "assault", "violence", "accident", "disaster", 
-               "frightening experience", "emotional trauma", "childhood trauma"]
-}
+# spaCy entity extraction, loaded lazily on first use.
+# CALMORA_ENTITY_MODE selects "full", "ner-only" (default) or "off".
+entity_extractor = EntityExtractor(
+    mode=os.environ.get("CALMORA_ENTITY_MODE", "ner-only"),
+    model_name=os.environ.get("CALMORA_SPACY_MODEL", "en_core_web_sm"),
+)
+
+# VADER sentiment analyzer, created on first use
+analyzer = None
+
+# CALMORA_NLU_WORKER=<socket path or host:port> sends analysis to a shared
+# NLU worker (see nlu_worker.py) instead of loading the models in this process
+nlu_client = NLUClient(os.environ["CALMORA_NLU_WORKER"]) if os.environ.get("CALMORA_NLU_WORKER") else None
+
+# CALMORA_INTENT_ENGINE="matrix" scores batches (analyze_batch, /chat/batch, the
+# NLU worker) with a sparse keyword-by-intent matrix product; same results as
+# the regex matcher. Single messages stay on the regex matcher, which is
+# cheaper than building sparse matrices for one row. numpy and scipy are only
+# imported when it is selected.
+INTENT_ENGINE = os.environ.get("CALMORA_INTENT_ENGINE", "regex")
+if INTENT_ENGINE == "matrix":
+    from intent_matrix import SparseIntentScorer
+elif INTENT_ENGINE != "regex":
+    raise ValueError(f"Unknown intent engine {INTENT_ENGINE!r}, expected 'regex' or 'matrix'")
+
+class IntentModel:
+    """
+    The "intents" knowledge section (intent -> keywords, from intents.json)
+    compiled into a single-pass matcher, plus the matrix scorer when selected.
+    """
+
+    __slots__ = ("keywords", "matcher", "scorer")
+
+    def __init__(self, keyword_map):
+        self.keywords = keyword_map
+        self.matcher = KeywordMatcher(keyword_map, priority_intent="suicide")
+        self.scorer = None
+        if INTENT_ENGINE == "matrix":
+            self.scorer = SparseIntentScorer(keyword_map, priority_intent="suicide")
+
+# Keywords and response templates live in CALMORA_KNOWLEDGE_DIR (default
+# backend/knowledge) and are recompiled and swapped in when the files change,
+# checked every CALMORA_KNOWLEDGE_RELOAD_SECONDS (0 loads them once).
+KNOWLEDGE_DIR = os.environ.get(
+    "CALMORA_KNOWLEDGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge"))
+knowledge = KnowledgeBase(KNOWLEDGE_DIR, float(os.environ.get("CALMORA_KNOWLEDGE_RELOAD_SECONDS", 2)))
+knowledge.add_section("intents", "intents.json", IntentModel)
+
+# Intents screened for before the regular pipeline runs
+CRISIS_INTENTS = ("suicide", "self_harm")
+
+def knowledge_of(message):
+    """
+    The knowledge snapshot an AnalyzedMessage is analyzed with, taken on first
+    use and kept on it, so a reload mid-request can't mix two versions.
+    """
+    if message.knowledge is None:
+        message.knowledge = knowledge.current
+    return message.knowledge
+
+def keyword_hits(message):
+    """
+    Keywords present in an AnalyzedMessage, matched once and kept on it.
+    """
+    if message.keyword_hits is None:
+        message.keyword_hits = knowledge_of(message)["intents"].matcher.find(message.lower)
+    return message.keyword_hits
 
 def extract_intent(user_message):
     """
     Enhanced rule-based intent classifier with expanded mental health topics.
     Returns the most specific matching intent based on keyword analysis.
+    Suicide keywords take priority; otherwise the intent with the most keyword
+    matches wins, using a single pass of the compiled matcher.
+    Accepts a message string or an AnalyzedMessage.
     """
-    lower_msg = user_message.lower()
-    
-    # First check for suicide intent as highest priority
-    for keyword in INTENT_KEYWORDS["suicide"]:
-        if keyword in lower_msg:
-            return "suicide"
-    
-    # Track matches and their counts to find the most specific intent
-    matches = {}
-    
-    for intent, keywords in INTENT_KEYWORDS.items():
-        count = 0
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', lower_msg):
-                count += 1
-        if count > 0:
-            matches[intent] = count
-    
-    # If we found matches, return the intent with the most keyword matches
-    if matches:
-        return max(matches.items(), key=lambda x: x[1])[0]
-    
-    # Default to general if no matches found
-    return "general"
+    message = as_analyzed(user_message)
+    return knowledge_of(message)["intents"].matcher.classify_hits(message.lower, keyword_hits(message))
 
 def extract_entities(user_message):
     """
-    Extract entities from the message using spaCy.
+    Extract entities from the message using spaCy. The Doc is kept on the
+    AnalyzedMessage so later consumers don't parse the message again.
     """
-    doc = nlp(user_message)
-    return {ent.label_: ent.text for ent in doc.ents}
+    if entity_extractor.mode == "off":
+        return {}
+    message = as_analyzed(user_message)
+    if message.doc is None:
+        message.doc = entity_extractor.nlp(message.text)
+    return entity_extractor.to_dict(message.doc)
 
 def analyze_sentiment(user_message):
     """
     Return the compound sentiment score using VADER.
     Score ranges from -1 (very negative) to +1 (very positive).
+    Accepts a message string or an AnalyzedMessage.
     """
+    global analyzer
+    if analyzer is None:
+        analyzer = SentimentIntensityAnalyzer()
+    if isinstance(user_message, AnalyzedMessage):
+        user_message = user_message.text
     scores = analyzer.polarity_scores(user_message)
     return scores["compound"]
 
+# Cache of analyze_message results, keyed by the normalized message and the
+# knowledge version it was analyzed with.
+# CALMORA_NLU_CACHE_SIZE=0 turns it off.
+analysis_cache = AnalysisCache(
+    max_size=int(os.environ.get("CALMORA_NLU_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("CALMORA_NLU_CACHE_TTL", 600)),
+    max_message_length=int(os.environ.get("CALMORA_NLU_CACHE_MAX_LENGTH", 500)),
+)
+
+# Bounded pool the NLU stages are offloaded to.
+# CALMORA_NLU_POOL_SIZE=0 (default) runs them inline on the request thread.
+nlu_executor = NLUExecutor(int(os.environ.get("CALMORA_NLU_POOL_SIZE", 0)))
+
+def configure_executor(pool_size, max_pending=None):
+    """
+    Replace the NLU executor, e.g. to size it from app config or a benchmark.
+    """
+    global nlu_executor
+    old, nlu_executor = nlu_executor, NLUExecutor(pool_size, max_pending)
+    old.shutdown()
+    return nlu_executor
+
+# Per-stage costs learned from this process, and the planner that fits the
+# pipeline into a latency budget. CALMORA_LATENCY_BUDGET_MS sets the default
+# budget; unset, every message gets the full pipeline unless it asks for less.
+stage_costs = StageCostModel()
+tier_planner = TierPlanner(
+    stage_costs,
+    default_budget_ms=float(os.environ["CALMORA_LATENCY_BUDGET_MS"])
+    if os.environ.get("CALMORA_LATENCY_BUDGET_MS") else None,
+)
+
+STAGE_FUNCTIONS = {
+    "intent": extract_intent,
+    "sentiment": analyze_sentiment,
+    "entities": extract_entities,
+}
+
+def _timed_stage(stage, fn, user_message):
+    start = time.thread_time()
+    with registry.time(STAGE_SECONDS, stage=stage):
+        result = fn(user_message)
+    # CPU time, so the learned cost doesn't include waiting on other threads
+    stage_costs.record(stage, time.thread_time() - start)
+    return result
+
+def analyze_message(user_message, budget_ms=None):
+    """
+    Run intent, sentiment and entity extraction for one message, served from
+    the analysis cache when the same message was seen recently. The three
+    stages are independent, share one AnalyzedMessage and run concurrently
+    when the executor is enabled.
+
+    With a latency budget (budget_ms, else CALMORA_LATENCY_BUDGET_MS) only
+    the tier that fits is run: "intent" (keywords only), "sentiment" (+ VADER)
+    or "entities" (+ spaCy). Skipped stages come back as None.
+    Returns {"intent", "sentiment", "entities", "tier"}; treat it as read-only.
+    """
+    message = as_analyzed(user_message)
+    if nlu_client is not None:
+        # The shared worker always runs the full pipeline; its keywords come
+        # from the same knowledge files, so the version still keys the cache
+        key = f"{knowledge_of(message).version}\0{message.text}"
+        analysis = analysis_cache.get_or_compute(key, lambda: nlu_client.analyze(message.text), len(message.text))
+        registry.inc(NLU_TIERS, tier=FULL_TIER)
+        return dict(analysis, tier=FULL_TIER)
+    with tier_planner.track() as load:
+        tier = tier_planner.choose(budget_ms, load)
+        registry.inc(NLU_TIERS, tier=tier)
+        stages = TIER_STAGES[tier]
+        # Results depend on the keywords, so a reload starts from a fresh cache
+        version = knowledge_of(message).version
+        key = f"{version}\0{message.text}" if tier == FULL_TIER else f"{version}\0{tier}\0{message.text}"
+        analysis = analysis_cache.get_or_compute(key, lambda: nlu_executor.run_stages({
+            stage: (_timed_stage, stage, STAGE_FUNCTIONS[stage], message) for stage in stages
+        }), len(message.text))
+    return {
+        "intent": analysis["intent"],
+        "sentiment": analysis.get("sentiment"),
+        "entities": analysis.get("entities"),
+        "tier": tier,
+    }
+
+def analyze_crisis(user_message):
+    """
+    Crisis pre-screen, run before the regular pipeline. Returns None for
+    ordinary messages. For messages with suicide or self-harm keywords it
+    returns the analysis directly, skipping every stage that can't change
+    the answer: suicide always gets the same response, so sentiment is
+    skipped too (None); entities never affect the response and are skipped
+    for all crisis messages (None). The result has "crisis": True and
+    "tier": "crisis"; crisis messages are never cut down to fit a budget.
+    Crisis messages bypass the analysis cache and the NLU executor queue.
+    The self-harm sentiment is always scored with VADER in this process,
+    even with a shared NLU worker, so a crisis reply never waits in the
+    worker's batches or fails with them. The keyword scan done here
+    is kept on the AnalyzedMessage, so passing the same object on to
+    analyze_message() doesn't scan it again.
+    """
+    message = as_analyzed(user_message)
+    with registry.time(STAGE_SECONDS, stage="crisis_screen"):
+        matcher = knowledge_of(message)["intents"].matcher
+        if matcher.has_priority(message.lower):
+            return {"intent": "suicide", "sentiment": None, "entities": None, "crisis": True, "tier": "crisis"}
+        counts = matcher.counts_from_hits(keyword_hits(message))
+        if not any(intent in counts for intent in CRISIS_INTENTS):
+            return None
+    return {
+        "intent": _timed_stage("intent", extract_intent, message),
+        "sentiment": _timed_stage("sentiment", analyze_sentiment, message),
+        "entities": None,
+        "crisis": True,
+        "tier": "crisis",
+    }
+
+@registry.register_collector
+def _nlu_metrics():
+    stats = analysis_cache.stats
+    return [
+        ("calmora_nlu_cache_events_total", "counter", "Analysis cache lookups by outcome.",
+         [({"event": event}, count) for event, count in stats.items()]),
+        ("calmora_nlu_cache_entries", "gauge", "Entries held in the analysis cache.", len(analysis_cache)),
+        ("calmora_nlu_pool_size", "gauge", "Threads in the NLU executor (0 = inline).", nlu_executor.pool_size),
+        ("calmora_nlu_pool_in_flight", "gauge", "NLU stages running or queued.", nlu_executor.in_flight),
+        ("calmora_entity_model_loaded", "gauge", "Whether the spaCy model is loaded.", int(entity_extractor.loaded)),
+        ("calmora_stage_cost_estimate_seconds", "gauge", "Learned per-stage cost used to pick the NLU tier.",
+         [({"stage": stage}, cost) for stage, cost in stage_costs.snapshot().items()]),
+        ("calmora_nlu_tier_in_flight", "gauge", "Analyses running, as seen by the tier planner.",
+         tier_planner.in_flight),
+    ]
+
+@registry.register_collector
+def _knowledge_metrics():
+    snapshot = knowledge.current
+    stats = knowledge.stats
+    return [
+        ("calmora_knowledge_info", "gauge", "Version of the knowledge snapshot being served.",
+         [({"version": snapshot.version}, 1)]),
+        ("calmora_knowledge_loaded_timestamp_seconds", "gauge", "When the knowledge snapshot was published.",
+         snapshot.loaded_at),
+        ("calmora_knowledge_reloads_total", "counter", "Knowledge snapshots swapped in after a file change.",
+         stats["reloads"]),
+        ("calmora_knowledge_sections_compiled_total", "counter", "Knowledge sections compiled, at start and on reload.",
+         stats["sections_compiled"]),
+        ("calmora_knowledge_errors_total", "counter", "Knowledge files that failed to load; the old snapshot is kept.",
+         stats["errors"]),
+    ]
+
+@registry.register_collector
+def _nlu_worker_metrics():
+    if nlu_client is None:
+        return []
+    try:
+        stats = nlu_client.stats()
+    except Exception:
+        return [("calmora_nlu_worker_up", "gauge", "Whether the shared NLU worker answered.", 0)]
+    return [
+        ("calmora_nlu_worker_up", "gauge", "Whether the shared NLU worker answered.", 1),
+        ("calmora_nlu_worker_batches_total", "counter", "Micro-batches analyzed by the NLU worker.", stats["batches"]),
+        ("calmora_nlu_worker_messages_total", "counter", "Messages analyzed by the NLU worker.", stats["messages"]),
+        ("calmora_nlu_worker_batch_seconds_total", "counter", "Time the NLU worker spent analyzing batches.",
+         stats["batch_seconds"]),
+        ("calmora_nlu_worker_max_batch_size", "gauge", "Largest micro-batch seen by the NLU worker.",
+         stats["max_batch_size_seen"]),
+        ("calmora_nlu_worker_errors_total", "counter", "Micro-batches that failed in the NLU worker.", stats["errors"]),
+    ]
+
+# Run through the pipeline at startup, so the first real messages don't pay
+# for cold VADER and spaCy code paths
+WARMUP_MESSAGES = (
+    "I have been feeling so lonely and sad lately.",
+    "I can't sleep and I am exhausted from work stress.",
+    "My anxiety is bad today, my heart is racing.",
+    "Thank you, things are getting better.",
+    "I went to the store on Tuesday.",
+)
+
+def warmup_phases():
+    """
+    Startup phases as (name, fn): load the models this process uses, then
+    analyze WARMUP_MESSAGES, which also fills the analysis cache and the
+    learned stage costs. With a shared NLU worker the models live there, so
+    only the connection to it is exercised; VADER is still loaded for the
+    crisis pre-screen.
+    """
+    if nlu_client is not None:
+        return [("sentiment_model", lambda: analyze_sentiment("warm up")),
+                ("nlu_worker", lambda: nlu_client.analyze(WARMUP_MESSAGES[0]))]
+    phases = [("sentiment_model", lambda: analyze_sentiment("warm up"))]
+    if entity_extractor.mode != "off":
+        phases.append(("entity_model", lambda: entity_extractor.extract("warm up")))
+    phases.append(("warmup_messages", lambda: [analyze_message(msg) for msg in WARMUP_MESSAGES]))
+    return phases
+
+def analyze_batch(user_messages, batch_size=64):
+    """
+    Analyze many messages at once. spaCy runs over the whole batch with
+    nlp.pipe, and so does the matrix intent engine when selected; sentiment
+    is computed per message. Accepts strings or AnalyzedMessages; ones
+    already pinned to a knowledge snapshot keep it.
+    Returns a list of {"intent", "sentiment", "entities"} dicts in input order.
+    """
+    if nlu_client is not None:
+        # Only text goes over the wire
+        return nlu_client.analyze_batch([as_analyzed(msg).text for msg in user_messages])
+    messages = [as_analyzed(msg) for msg in user_messages]
+    # The whole batch is analyzed with one knowledge snapshot: the one the
+    # caller pinned, else the current one
+    snapshot = next((msg.knowledge for msg in messages if msg.knowledge is not None), knowledge.current)
+    for msg in messages:
+        if msg.knowledge is None:
+            msg.knowledge = snapshot
+    if entity_extractor.mode != "off":
+        docs = entity_extractor.nlp.pipe([msg.text for msg in messages], batch_size=batch_size)
+        for msg, doc in zip(messages, docs):
+            msg.doc = doc
+    scorer = snapshot["intents"].scorer
+    if scorer is not None and all(msg.knowledge is snapshot for msg in messages):
+        intents = scorer.classify_batch([msg.lower for msg in messages])
+    else:
+        intents = [extract_intent(msg) for msg in messages]
+    return [
+        {"intent": intent, "sentiment": analyze_sentiment(msg), "entities": extract_entities(msg)}
+        for msg, intent in zip(messages, intents)
+    ]
+
 def get_follow_up_question(intent):
     """
     Returns None - follow-up questions have been disabled.
@@ -0,0 +1,242 @@
+# backend/nlu_worker.py
+#
+# Optional shared NLU worker. One process owns the spaCy and VADER models and
+# serves analysis requests from all web workers over a local socket, grouping
+# requests that arrive close together into micro-batches.
+#
+# Requests are pickled, so the worker only accepts peers that know the shared
+# CALMORA_NLU_WORKER_AUTHKEY, and only listens on loopback addresses.
+#
+#   export CALMORA_NLU_WORKER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+#   cd backend && python nlu_worker.py --address /tmp/calmora-nlu.sock
+#   CALMORA_NLU_WORKER=/tmp/calmora-nlu.sock python app.py
+
+import argparse
+import ipaddress
+import os
+import socket
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+
+class NLUWorkerUnavailable(Exception):
+    """
+    Raised by the client when the NLU worker can't be reached.
+    """
+
+
+class NLUWorkerError(NLUWorkerUnavailable):
+    """
+    Raised by the client when the NLU worker answered with an error, e.g.
+    because another message in the same micro-batch failed.
+    """
+
+
+def parse_address(address):
+    """
+    "host:port" for TCP, anything else is a Unix socket path.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def default_authkey():
+    """
+    The shared secret from CALMORA_NLU_WORKER_AUTHKEY. There is no default:
+    without it neither side starts.
+    """
+    authkey = os.environ.get("CALMORA_NLU_WORKER_AUTHKEY")
+    if not authkey:
+        raise ValueError("Set CALMORA_NLU_WORKER_AUTHKEY to the same secret for the NLU worker and its clients")
+    return authkey.encode()
+
+
+def check_loopback(address):
+    """
+    Refuse TCP addresses that aren't loopback: the protocol carries pickles.
+    """
+    if isinstance(address, str):
+        return
+    host = address[0]
+    try:
+        loopback = all(ipaddress.ip_address(info[4][0]).is_loopback
+                       for info in socket.getaddrinfo(host, None))
+    except (socket.gaierror, ValueError):
+        loopback = False
+    if not loopback:
+        raise ValueError(f"NLU worker address {host!r} is not a loopback address")
+
+
+class MicroBatcher:
+    """
+    Collects single-message requests and analyzes them in batches: a batch is
+    closed when max_batch_size requests are waiting or batch_window seconds
+    after its first request arrived, whichever comes first.
+    """
+
+    def __init__(self, analyze_batch, batch_window=0.005, max_batch_size=32):
+        self.analyze_batch = analyze_batch
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self.stats = {"batches": 0, "messages": 0, "max_batch_size_seen": 0,
+                      "batch_seconds": 0.0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="nlu-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, message, reply):
+        """
+        Queue a message; reply(result, error) is called once it is analyzed.
+        """
+        self._queue.put((message, reply))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        try:
+            results = self.analyze_batch([message for message, _ in batch])
+        except Exception as e:
+            self.stats["errors"] += 1
+            for _, reply in batch:
+                reply(None, repr(e))
+            return
+        self.stats["batches"] += 1
+        self.stats["messages"] += len(batch)
+        self.stats["batch_seconds"] += time.perf_counter() - start
+        self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], len(batch))
+        for (_, reply), result in zip(batch, results):
+            reply(result, None)
+
+
+def serve(address, authkey, batch_window, max_batch_size):
+    check_loopback(address)
+    # The worker analyzes locally; it must not become a client of itself
+    os.environ.pop("CALMORA_NLU_WORKER", None)
+    from nlu_utils import analyze_batch, entity_extractor
+
+    entity_extractor.extract("warm up")  # load the model before accepting requests
+    batcher = MicroBatcher(analyze_batch, batch_window, max_batch_size)
+
+    def handle(conn):
+        send_lock = threading.Lock()
+
+        def reply_to(request_id):
+            def reply(result, error):
+                with send_lock:
+                    conn.send((request_id, result, error))
+            return reply
+
+        try:
+            while True:
+                kind, request_id, payload = conn.recv()
+                if kind == "analyze":
+                    batcher.submit(payload, reply_to(request_id))
+                elif kind == "stats":
+                    reply_to(request_id)(dict(batcher.stats), None)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, authkey=authkey) as listener:
+        if isinstance(address, str):
+            os.chmod(address, 0o600)
+        print(f"NLU worker listening on {address} (window {batch_window * 1000:.1f} ms, max batch {max_batch_size})")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+class NLUClient:
+    """
+    Thin client used by the web workers. Each thread keeps its own connection
+    and waits for its answer, so concurrent requests from many threads and
+    processes reach the worker together and get batched there.
+    """
+
+    def __init__(self, address, authkey=None, timeout=10.0):
+        self.address = parse_address(address)
+        self.authkey = authkey or default_authkey()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, kind, payloads):
+        """
+        Send one request per payload on this thread's connection, then collect
+        the answers in order.
+        """
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn = self._local.conn = Client(self.address, authkey=self.authkey)
+            for request_id, payload in enumerate(payloads):
+                conn.send((kind, request_id, payload))
+            answers = {}
+            while len(answers) < len(payloads):
+                if not conn.poll(self.timeout):
+                    raise TimeoutError(f"no answer from NLU worker within {self.timeout}s")
+                request_id, result, error = conn.recv()
+                answers[request_id] = (result, error)
+        except (OSError, EOFError, TimeoutError) as e:
+            # Drop the connection; any late answers on it must not leak into the next call
+            self._local.conn = None
+            if conn is not None:
+                conn.close()
+            raise NLUWorkerUnavailable(str(e)) from e
+        results = []
+        for request_id in range(len(payloads)):
+            result, error = answers[request_id]
+            if error is not None:
+                raise NLUWorkerError(f"NLU worker failed: {error}")
+            results.append(result)
+        return results
+
+    def analyze(self, user_message):
+        """
+        Return {"intent", "sentiment", "entities"} for one message.
+        """
+        return self._call("analyze", [user_message])[0]
+
+    def analyze_batch(self, user_messages):
+        """
+        Pipeline all messages on one connection; the worker batches them.
+        """
+        return self._call("analyze", list(user_messages))
+
+    def stats(self):
+        return self._call("stats", [None])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared micro-batching NLU worker")
+    parser.add_argument("--address", default=os.environ.get("CALMORA_NLU_WORKER", "/tmp/calmora-nlu.sock"),
+                        help="Unix socket path or host:port")
+    parser.add_argument("--batch-window-ms", type=float,
+                        default=float(os.environ.get("CALMORA_NLU_BATCH_WINDOW_MS", 5)))
+    parser.add_argument("--max-batch-size", type=int,
+                        default=int(os.environ.get("CALMORA_NLU_MAX_BATCH_SIZE", 32)))
+    args = parser.parse_args()
+    serve(parse_address(args.address), default_authkey(), args.batch_window_ms / 1000, args.max_batch_size)
+
+
+if __name__ == "__main__":
+    main()
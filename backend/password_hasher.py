@@ -0,0 +1,152 @@
+# backend/password_hasher.py
+
+import multiprocessing
+import multiprocessing.context
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+_start_lock = threading.Lock()
+
+
+class HasherProcess(multiprocessing.context.ForkServerProcess):
+    """
+    A forkserver process that doesn't re-run the launching script.
+
+    multiprocessing tells every new child to import the parent's __main__
+    (as __mp_main__), which for `python app.py` is the whole app and NLU
+    stack. The hashing workers only need werkzeug.security, so __main__
+    is hidden while the child is started.
+    """
+
+    def start(self):
+        with _start_lock:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = types.ModuleType("__main__")
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = main
+
+
+class HasherContext(multiprocessing.context.ForkServerContext):
+    Process = HasherProcess
+
+
+def pool_context():
+    """
+    A forkserver context preloaded with werkzeug.security, or spawn where
+    forkserver isn't available (Windows).
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = HasherContext()
+    context.set_forkserver_preload(["werkzeug.security"])
+    return context
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the password hashing queue is full.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's password KDFs in a small process pool so login bursts
+    can't starve the request workers.
+
+    At most pool_size hashes run at once and at most max_pending wait;
+    beyond that HasherBusy is raised instead of queueing more CPU work.
+    A pool_size of 0 hashes inline, still subject to the same cap.
+    method is passed to generate_password_hash (e.g. "pbkdf2:sha256:600000"
+    or "pbkdf2:sha512:210000"); None uses werkzeug's default.
+    """
+
+    def __init__(self, method=None, pool_size=2, max_pending=16):
+        self.method = method
+        self.pool_size = pool_size
+        self.max_pending = max_pending
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(pool_size, 1) + max_pending)
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"hash_count": 0, "hash_seconds": 0.0, "verify_count": 0,
+                      "verify_seconds": 0.0, "rejected": 0}
+
+    def _get_pool(self):
+        # Created on first use. Workers are forked from a forkserver that
+        # has only werkzeug.security loaded, so they don't inherit the web
+        # process's threads and models or re-import app.py (see
+        # HasherProcess).
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.pool_size,
+                        mp_context=pool_context(),
+                    )
+        return self._pool
+
+    def _run(self, kind, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.stats["rejected"] += 1
+            raise HasherBusy()
+        with self._stats_lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            if self.pool_size > 0:
+                return self._get_pool().submit(fn, *args).result()
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.stats[f"{kind}_count"] += 1
+                self.stats[f"{kind}_seconds"] += elapsed
+            self._slots.release()
+
+    def hash(self, password):
+        if self.method is None:
+            return self._run("hash", generate_password_hash, password)
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords, chunksize=8):
+        """
+        Hash a list of passwords across the whole pool and return the hashes
+        in order. For bulk jobs: the max_pending cap doesn't apply.
+        """
+        args = [passwords] if self.method is None else [passwords, [self.method] * len(passwords)]
+        start = time.perf_counter()
+        if self.pool_size > 0:
+            hashes = list(self._get_pool().map(generate_password_hash, *args, chunksize=chunksize))
+        else:
+            hashes = list(map(generate_password_hash, *args))
+        with self._stats_lock:
+            self.stats["hash_count"] += len(hashes)
+            self.stats["hash_seconds"] += time.perf_counter() - start
+        return hashes
+
+    def verify(self, password_hash, password):
+        return self._run("verify", check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        True when a stored hash was made with a different method or cost
+        than the configured one.
+        """
+        if self.method is None:
+            return False
+        stored = password_hash.split("$", 1)[0]
+        return stored != self.method and not stored.startswith(self.method + ":")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
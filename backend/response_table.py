@@ -0,0 +1,79 @@
+# backend/response_table.py
+
+import gzip
+
+SENTIMENT_BUCKETS = ("positive", "neutral", "negative")
+
+
+def sentiment_bucket_index(sentiment):
+    """
+    Index into SENTIMENT_BUCKETS using select_response's +/-0.3 thresholds.
+    """
+    if sentiment >= 0.3:
+        return 0
+    if sentiment <= -0.3:
+        return 2
+    return 1
+
+
+class ResponseCell:
+    __slots__ = ("key", "text", "message", "body", "gzip_body")
+
+    def __init__(self, key, text, message, body, gzip_body):
+        self.key = key
+        self.text = text
+        self.message = message
+        self.body = body
+        self.gzip_body = gzip_body
+
+
+class ResponseTable:
+    """
+    RESPONSES compiled into a dense (intent, sentiment bucket) table.
+
+    Each cell holds its key ("intent/bucket", the response id kept in chat
+    history), the response text, the message actually sent (text plus any
+    follow-up question), its JSON body already encoded to bytes and, if
+    enabled, a gzipped copy of that body, so answering a chat message is an
+    index and a write.
+
+    responses:         intent -> {"positive"/"neutral"/"negative"} or {"default"}
+    sentiment_intents: intents whose answer depends on the sentiment bucket
+    fixed_intents:     intents that always answer with their "default" text
+    encode:            message -> JSON body bytes
+    follow_up:         intent -> follow-up question or None, appended to the message
+    Unknown intents use the "general" row.
+    """
+
+    def __init__(self, responses, sentiment_intents, fixed_intents=("suicide",),
+                 encode=None, follow_up=None, gzip_bodies=False):
+        self.gzip_bodies = gzip_bodies
+        self._index = {}
+        self._cells = []
+        for intent in responses:
+            self._index[intent] = len(self._index)
+            for bucket in SENTIMENT_BUCKETS:
+                if intent in fixed_intents:
+                    text = responses[intent]["default"]
+                elif intent in sentiment_intents:
+                    text = responses[intent][bucket]
+                else:
+                    text = responses["general"][bucket]
+                message = text
+                question = follow_up(intent) if follow_up else None
+                if question:
+                    message += f"\n\n{question}"
+                body = encode(message) if encode else None
+                gzip_body = gzip.compress(body, mtime=0) if gzip_bodies and body is not None else None
+                self._cells.append(ResponseCell(f"{intent}/{bucket}", text, message, body, gzip_body))
+        self._general = self._index["general"]
+
+    def lookup(self, intent, sentiment):
+        row = self._index.get(intent, self._general)
+        return self._cells[row * 3 + sentiment_bucket_index(sentiment)]
+
+    def text(self, intent, sentiment):
+        return self.lookup(intent, sentiment).text
+
+    def __len__(self):
+        return len(self._cells)
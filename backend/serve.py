@@ -0,0 +1,157 @@
+# backend/serve.py
+#
+# Development and benchmark launcher: load the app and models once in a
+# master process, freeze the heap, then fork workers that share those pages
+# copy-on-write, and report per-worker memory. Workers run Werkzeug's
+# development server; production uses gunicorn with gunicorn.conf.py, which
+# preloads the same way.
+#
+#   cd backend && python serve.py --workers 4 --port 5000
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from metrics import process_memory_breakdown
+
+
+def preload():
+    """
+    Import the app and load everything that is read-only afterwards: spaCy,
+    VADER and the compiled knowledge snapshot (intent matcher, response table).
+    Warm-up runs to completion here, before any worker is forked, so workers
+    start out ready.
+    """
+    # Threads don't survive a fork, so warm up on this thread by default
+    os.environ.setdefault("CALMORA_WARMUP", "blocking")
+    import app as app_module
+
+    app_module.warmup.wait()
+    startup_report(app_module.warmup.report())
+    if app_module.warmup.state == "failed":
+        sys.exit(f"start-up failed: {app_module.warmup.error}")
+    app_module.release_connections()
+    return app_module
+
+
+def startup_report(report):
+    print(f"{'phase':<18} {'seconds':>9}")
+    for phase in report["phases"]:
+        status = "" if phase["status"] == "ok" else f"  {phase['status']}"
+        print(f"{phase['phase']:<18} {phase['seconds']:>9.3f}{status}")
+    print(f"{'total':<18} {report['startup_seconds']:>9.3f}")
+    sys.stdout.flush()
+
+
+def run_worker(app_module, listen_fd, threads, access_log):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app_module.init_worker()
+    gc.enable()
+    server = make_server("0.0.0.0", 0, app_module.app, threaded=threads, fd=listen_fd,
+                         request_handler=None if access_log else QuietRequestHandler)
+    # Restarted workers inherit the master's handlers; reset them
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        # The worker ends in os._exit, so atexit handlers never run
+        app_module.shutdown_worker()
+
+
+def memory_report(pids):
+    print(f"{'pid':>8} {'rss MB':>9} {'shared MB':>10} {'private MB':>11} {'pss MB':>8}")
+    for label, pid in pids:
+        memory = process_memory_breakdown(pid)
+        if memory is None:
+            print(f"{pid:>8} (memory breakdown unavailable)")
+            continue
+        print(f"{pid:>8} {memory['rss'] / 2**20:>9.1f} {memory['shared'] / 2**20:>10.1f} "
+              f"{memory['private'] / 2**20:>11.1f} {memory['pss'] / 2**20:>8.1f}  {label}")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload-and-fork server for the Calmora backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", action=argparse.BooleanOptionalAction, default=True,
+                        help="serve each worker's requests on threads")
+    parser.add_argument("--access-log", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--report-after", type=float, default=5.0,
+                        help="print per-worker memory this many seconds after start (also on SIGUSR1)")
+    args = parser.parse_args()
+
+    # Keep the collector from touching (and un-sharing) the preloaded objects
+    gc.disable()
+    app_module = preload()
+    gc.collect()
+    gc.freeze()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+
+    workers = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app_module, listener.fileno(), args.threads, args.access_log)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"master {os.getpid()} serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            os.kill(pid, signal.SIGTERM)
+
+    def report(*_):
+        memory_report([("master", os.getpid())] + [("worker", pid) for pid in workers])
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    report_at = time.monotonic() + args.report_after
+    while workers:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.pop(pid, None)
+            if not stopping:
+                print(f"worker {pid} exited, restarting")
+                spawn()
+            continue
+        if report_at and time.monotonic() >= report_at:
+            report_at = None
+            report()
+        time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    main()
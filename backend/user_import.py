@@ -0,0 +1,143 @@
+# backend/user_import.py
+
+import csv
+import json
+import os
+import time
+
+USER_FIELDS = ("name", "email", "password")
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path):
+    return "jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson") else "csv"
+
+
+def read_users(f, fmt):
+    """
+    Stream (line number, record, error) from an open CSV (with a header row)
+    or JSON Lines file. record is a dict with USER_FIELDS, or None when the
+    line couldn't be parsed and error says why.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        missing = [field for field in USER_FIELDS if field not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"CSV header is missing {', '.join(missing)}")
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_num, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_num, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_num, None, "expected a JSON object"
+            continue
+        yield line_num, record, None
+
+
+def validate_user(record, is_valid_email, min_password_length=6):
+    """
+    Apply /register's rules to one record. Returns (user, error): user is
+    {"name", "email", "password"} with surrounding whitespace stripped.
+    """
+    user = {field: str(record.get(field) or "").strip() for field in USER_FIELDS}
+    if not all(user.values()):
+        return None, "name, email and password are required"
+    if not is_valid_email(user["email"]):
+        return None, "invalid email address"
+    if len(user["password"]) < min_password_length:
+        return None, f"password must be at least {min_password_length} characters long"
+    return user, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = 0
+        self.created = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.read} rows in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s): "
+                f"{self.created} created, {self.existing} already registered, "
+                f"{self.duplicates} repeated in the file, {self.invalid} invalid")
+
+
+def import_users(records, existing_emails, hash_passwords, insert_users, on_error,
+                 is_valid_email, chunk_size=500, on_chunk=None):
+    """
+    Import records from read_users() chunk_size at a time, so memory stays
+    bounded whatever the file size. Per chunk: validate every row, drop
+    emails already registered with one existing_emails(emails) -> set query,
+    hash the new users' passwords with one hash_passwords(passwords) call and
+    write them with one insert_users(rows) transaction, which returns the
+    emails it actually wrote; rows it skipped (a user registered since the
+    check) count as already registered. Each chunk is committed before the
+    next is checked, so an email repeated further down the file is caught as
+    already registered.
+
+    on_error(line, email, error) is called for every rejected row and
+    on_chunk(report) after every chunk. Returns the ImportReport.
+    """
+    report = ImportReport()
+    chunk = []
+
+    def flush():
+        # Later rows with the same email as an earlier one are rejected
+        users = {}
+        for line, user in chunk:
+            if user["email"] in users:
+                report.duplicates += 1
+                on_error(line, user["email"], "email repeated earlier in the file")
+            else:
+                users[user["email"]] = (line, user)
+        existing = existing_emails(list(users))
+        for email in existing:
+            line, _ = users.pop(email)
+            report.existing += 1
+            on_error(line, email, "a user with this email already exists")
+        new_users = [user for _, user in users.values()]
+        if new_users:
+            hashes = hash_passwords([user["password"] for user in new_users])
+            written = insert_users([{"name": user["name"], "email": user["email"], "password_hash": password_hash}
+                                    for user, password_hash in zip(new_users, hashes)])
+            for line, user in users.values():
+                if user["email"] in written:
+                    report.created += 1
+                else:
+                    report.existing += 1
+                    on_error(line, user["email"], "a user with this email already exists")
+        chunk.clear()
+        if on_chunk is not None:
+            on_chunk(report)
+
+    for line, record, error in records:
+        report.read += 1
+        if error is None:
+            user, error = validate_user(record, is_valid_email)
+        if error is not None:
+            report.invalid += 1
+            on_error(line, str((record or {}).get("email") or ""), error)
+            continue
+        chunk.append((line, user))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
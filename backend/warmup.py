@@ -0,0 +1,110 @@
+# backend/warmup.py
+
+import threading
+import time
+import traceback
+
+WARMUP_MODES = ("background", "blocking", "off")
+
+# Timings start when this module is imported; import it before Flask and friends
+IMPORTED_AT = time.perf_counter()
+
+
+class Warmup:
+    """
+    Timed startup phases, run in order on the calling thread or in the
+    background so the server can bind and answer health checks meanwhile.
+
+    add(name, fn) registers a phase; run() executes them in order, timing
+    each, and start() does the same on a daemon thread. Timings start at
+    started (by default when this module was imported); time spent before
+    the phases, e.g. importing the app, is recorded with mark(). A phase that
+    raises stops the run and leaves the process "failed"; otherwise it ends
+    "ready". wait_for(name) lets a request block until a phase it depends on
+    (say, creating the database tables) has finished.
+    """
+
+    def __init__(self, started=IMPORTED_AT):
+        self.created = started
+        self._last_mark = self.created
+        self._phases = []
+        self._done = {}
+        self.timings = []  # (phase, seconds, "ok" / "failed" / "skipped")
+        self.state = "starting"
+        self.error = None
+        self.total_seconds = None
+        self._finished = threading.Event()
+        self._thread = None
+
+    def add(self, name, fn):
+        self._phases.append((name, fn))
+        self._done[name] = threading.Event()
+
+    def mark(self, name):
+        """
+        Record the time since creation (or the previous mark) as a phase.
+        """
+        now = time.perf_counter()
+        self.timings.append((name, now - self._last_mark, "ok"))
+        self._last_mark = now
+
+    def run(self):
+        self.state = "warming"
+        for name, fn in self._phases:
+            if self.error is not None:
+                self.timings.append((name, 0.0, "skipped"))
+                self._done[name].set()
+                continue
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                self.timings.append((name, time.perf_counter() - start, "failed"))
+                traceback.print_exc()
+            else:
+                self.timings.append((name, time.perf_counter() - start, "ok"))
+            self._done[name].set()
+        self.total_seconds = time.perf_counter() - self.created
+        self.state = "failed" if self.error is not None else "ready"
+        self._finished.set()
+
+    def start(self):
+        self.state = "warming"
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait(self, timeout=None):
+        """
+        Wait for the run to finish (and its thread to exit, e.g. before a fork).
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return self._finished.wait(timeout)
+
+    def wait_for(self, name, timeout=None):
+        """
+        Wait until phase name has run; True if it finished without failing.
+        Unknown phases count as done.
+        """
+        event = self._done.get(name)
+        if event is None:
+            return True
+        if not event.wait(timeout):
+            return False
+        return not any(phase == name and status != "ok" for phase, _, status in self.timings)
+
+    def report(self):
+        return {
+            "state": self.state,
+            "error": self.error,
+            "uptime_seconds": round(time.perf_counter() - self.created, 3),
+            "startup_seconds": round(self.total_seconds, 3) if self.total_seconds is not None else None,
+            "phases": [{"phase": phase, "seconds": round(seconds, 4), "status": status}
+                       for phase, seconds, status in list(self.timings)],
+        }